@@ -1,27 +1,43 @@
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
+import httpx
 from fastapi import FastAPI
 
 from app.config import settings
 from app.middleware.auth import APIKeyMiddleware
+from app.responses import ORJSONResponse
 from app.routes import saves, status, sync, titles, update
-from app.services import game_names
+from app.services import game_names, storage
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     settings.save_dir.mkdir(parents=True, exist_ok=True)
+    await asyncio.to_thread(storage.recover_interrupted_stores)
     # Load game names databases (3DS + DS)
     data_dir = Path(__file__).parent.parent / "data"
-    count_3ds = game_names.load_database(data_dir / "3dstdb.txt")
-    count_ds = game_names.load_database(data_dir / "dstdb.txt")
+    count_3ds, count_ds = await asyncio.gather(
+        asyncio.to_thread(game_names.load_database, data_dir / "3dstdb.txt"),
+        asyncio.to_thread(game_names.load_database, data_dir / "dstdb.txt"),
+    )
+    # Merge only after both loads finish so neither thread sees a partial database
+    game_names.rebuild_merged()
     print(f"Loaded {count_3ds} 3DS + {count_ds} DS game names from database")
-    yield
+    # Shared HTTP client so outbound GitHub requests reuse connections
+    async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as http:
+        app.state.http = http
+        yield
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="3DS Save Sync", version="1.0.0", lifespan=lifespan)
+    app = FastAPI(
+        title="3DS Save Sync",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
 
     app.add_middleware(APIKeyMiddleware)
 
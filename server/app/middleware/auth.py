@@ -1,21 +1,55 @@
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+import hmac
+
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.config import settings
 
+# Paths that don't need an API key (docs and health check)
+_SKIP_PATHS = frozenset({"/docs", "/redoc", "/openapi.json", "/api/v1/status"})
+# Path prefixes that don't need an API key (e.g. /docs/oauth2-redirect)
+_SKIP_PREFIXES = ("/docs/",)
+
+_UNAUTHORIZED_BODY = b'{"detail":"Invalid or missing API key"}'
+_UNAUTHORIZED_START = {
+    "type": "http.response.start",
+    "status": 401,
+    "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(_UNAUTHORIZED_BODY)).encode()),
+    ],
+}
+
+
+class APIKeyMiddleware:
+    """Pure ASGI middleware that rejects requests without a valid X-API-Key."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # Header values arrive as raw bytes, so encode the key once to compare
+        # against them. Read here rather than at import so settings overrides
+        # made before the app starts still apply
+        self.api_key = settings.api_key.encode("utf-8")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in _SKIP_PATHS or path.startswith(_SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Skip auth for docs and health check
-        if request.url.path in ("/docs", "/openapi.json", "/api/v1/status"):
-            return await call_next(request)
+        api_key = b""
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                api_key = value
+                break
 
-        api_key = request.headers.get("X-API-Key")
-        if api_key != settings.api_key:
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Invalid or missing API key"},
-            )
+        # Constant-time compare so the key can't be guessed from response timing
+        if not hmac.compare_digest(api_key, self.api_key):
+            await send(_UNAUTHORIZED_START)
+            await send({"type": "http.response.body", "body": _UNAUTHORIZED_BODY})
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
@@ -4,8 +4,10 @@ import struct
 import hashlib
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from typing import Annotated
 
-from pydantic import BaseModel, field_validator
+import msgspec
+from pydantic import BaseModel
 
 
 BUNDLE_MAGIC = b"3DSS"
@@ -13,12 +15,23 @@ BUNDLE_VERSION = 1
 BUNDLE_VERSION_COMPRESSED = 2
 
 
-@dataclass
+@dataclass(slots=True)
 class BundleFile:
     path: str
     size: int
     sha256: bytes  # 32 bytes
-    data: bytes = b""
+    # Parsed bundles hold views into the payload buffer rather than copies
+    data: bytes | memoryview = b""
+
+    def materialize(self) -> bytes:
+        """Return data as bytes, copying it out of a shared buffer if needed.
+
+        The copy replaces the view, so the payload buffer can be freed once
+        every file of a parsed bundle has been materialized.
+        """
+        if not isinstance(self.data, bytes):
+            self.data = bytes(self.data)
+        return self.data
 
 
 @dataclass
@@ -42,12 +55,15 @@ class SaveMetadata:
     name: str
     last_sync: str  # ISO 8601
     last_sync_source: str
-    save_hash: str  # sha256 of the full bundle
+    save_hash: bytes  # raw sha256 of all file data (hex in JSON)
     save_size: int
     file_count: int
     client_timestamp: int  # timestamp reported by the 3DS
     server_timestamp: str  # server wall-clock time at upload
     console_id: str = ""  # ID of the console that uploaded this save
+    # Per-file {"path", "size", "sha256"} recorded at upload so downloads
+    # don't have to rehash stored files
+    files: list[dict] = field(default_factory=list)
 
     def to_dict(self) -> dict:
         return {
@@ -55,34 +71,38 @@ class SaveMetadata:
             "name": self.name,
             "last_sync": self.last_sync,
             "last_sync_source": self.last_sync_source,
-            "save_hash": self.save_hash,
+            "save_hash": self.save_hash.hex(),
             "save_size": self.save_size,
             "file_count": self.file_count,
             "client_timestamp": self.client_timestamp,
             "server_timestamp": self.server_timestamp,
             "console_id": self.console_id,
+            "files": self.files,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> SaveMetadata:
+        return cls(**{**data, "save_hash": bytes.fromhex(data["save_hash"])})
+
 
-class TitleSyncInfo(BaseModel):
+# Validated by msgspec itself so errors point at the title_id field
+TitleId = Annotated[str, msgspec.Meta(pattern="^[0-9A-Fa-f]{16}$")]
+
+
+class TitleSyncInfo(msgspec.Struct):
     """Metadata for a single title sent by the 3DS during sync."""
-    title_id: str
+    title_id: TitleId
     save_hash: str
     timestamp: int
     size: int
     last_synced_hash: str | None = None
     console_id: str | None = None  # ID of the console sending this
 
-    @field_validator("title_id")
-    @classmethod
-    def validate_title_id(cls, v: str) -> str:
-        v = v.upper()
-        if len(v) != 16 or not all(c in "0123456789ABCDEF" for c in v):
-            raise ValueError("title_id must be 16 hex characters")
-        return v
+    def __post_init__(self) -> None:
+        self.title_id = self.title_id.upper()
 
 
-class SyncRequest(BaseModel):
+class SyncRequest(msgspec.Struct):
     """Batch metadata from 3DS for sync planning."""
     titles: list[TitleSyncInfo]
     console_id: str | None = None  # ID of the console making the request
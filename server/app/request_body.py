@@ -0,0 +1,105 @@
+"""msgspec request body decoding for routes that read the raw request.
+
+Routes that decode with msgspec instead of Pydantic lose FastAPI's generated
+request schema and its 422 error format; these helpers restore both.
+"""
+
+import re
+from typing import TypeVar
+
+import msgspec
+from fastapi.exceptions import RequestValidationError
+
+T = TypeVar("T")
+
+# msgspec reports the failing location only inside its error message, e.g.
+# "Expected `int`, got `str` - at `$.titles[0].timestamp`". The format is
+# pinned by tests/test_request_body.py so a msgspec upgrade that changes it
+# fails there instead of silently degrading error locations.
+_ERROR_PATH_RE = re.compile(r" - at `\$(.*)`$")
+_PATH_PART_RE = re.compile(r"\.(\w+)|\[(\d+)\]")
+_MISSING_FIELD_RE = re.compile(r"^Object missing required field `(\w+)`$")
+
+_MISSING = object()
+
+
+def _inline_refs(schema, defs: dict):
+    """Replace $defs references in a msgspec JSON schema with the definitions.
+
+    OpenAPI resolves refs against the whole document, where msgspec's $defs
+    don't exist. Request models here aren't recursive, so inlining terminates.
+    """
+    if isinstance(schema, dict):
+        if "$ref" in schema:
+            return _inline_refs(defs[schema["$ref"].rpartition("/")[2]], defs)
+        return {key: _inline_refs(value, defs) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [_inline_refs(value, defs) for value in schema]
+    return schema
+
+
+def openapi_request_body(model: type) -> dict:
+    """Build an openapi_extra entry documenting model as the JSON request body."""
+    schema = msgspec.json.schema(model)
+    schema = _inline_refs(schema, schema.pop("$defs", {}))
+    return {
+        "requestBody": {
+            "content": {"application/json": {"schema": schema}},
+            "required": True,
+        },
+    }
+
+
+def _lookup(data, loc: list[str | int]):
+    """Follow loc into decoded JSON, or return _MISSING if it isn't there."""
+    for key in loc:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return _MISSING
+    return data
+
+
+def _validation_error(e: msgspec.DecodeError, body: bytes) -> RequestValidationError:
+    """Convert a msgspec decode failure to FastAPI's standard 422 error."""
+    if not isinstance(e, msgspec.ValidationError):
+        # Not valid JSON at all, so there's no location or input to report
+        return RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body",), "msg": str(e), "input": None}]
+        )
+
+    msg = str(e)
+    path: list[str | int] = []
+    if match := _ERROR_PATH_RE.search(msg):
+        msg = msg[: match.start()]
+        path = [
+            int(index) if index else key
+            for key, index in _PATH_PART_RE.findall(match[1])
+        ]
+
+    # Like Pydantic, report a missing field at the field itself, with the
+    # object it's missing from as the input
+    error_type = "value_error"
+    input_value = _lookup(msgspec.json.decode(body), path)
+    if missing := _MISSING_FIELD_RE.match(msg):
+        error_type = "missing"
+        path.append(missing[1])
+
+    return RequestValidationError([{
+        "type": error_type,
+        "loc": ("body", *path),
+        "msg": msg,
+        "input": None if input_value is _MISSING else input_value,
+    }])
+
+
+def decode_body(body: bytes, model: type[T]) -> T:
+    """Decode a JSON request body into model, raising FastAPI's 422 on failure.
+
+    Decoding is lax like Pydantic's default mode, so e.g. 1000.0 or "1000"
+    are still accepted for int fields.
+    """
+    try:
+        return msgspec.json.decode(body, type=model, strict=False)
+    except msgspec.DecodeError as e:
+        raise _validation_error(e, body)
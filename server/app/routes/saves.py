@@ -1,20 +1,24 @@
+import asyncio
 import hashlib
-import re
 
 from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 
 from app.models.save import BundleFile, SaveBundle
 from app.services import storage
-from app.services.bundle import BundleError, create_bundle, parse_bundle
+from app.services.bundle import BundleError, parse_bundle_stream, stream_bundle
 
 router = APIRouter()
 
-_TITLE_ID_RE = re.compile(r"^[0-9A-Fa-f]{16}$")
-
 
 def _validate_title_id(title_id: str) -> str:
     """Validate and normalize title ID to uppercase hex."""
-    if not _TITLE_ID_RE.match(title_id):
+    # bytes.fromhex skips whitespace, so also check it decoded to 8 bytes
+    try:
+        valid = len(title_id) == 16 and len(bytes.fromhex(title_id)) == 8
+    except ValueError:
+        valid = False
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid title ID format")
     return title_id.upper()
 
@@ -22,7 +26,7 @@ def _validate_title_id(title_id: str) -> str:
 @router.get("/saves/{title_id}/meta")
 async def get_save_meta(title_id: str):
     title_id = _validate_title_id(title_id)
-    meta = storage.get_metadata(title_id)
+    meta = await asyncio.to_thread(storage.get_metadata, title_id)
     if meta is None:
         raise HTTPException(status_code=404, detail="No save found for this title")
     return meta.to_dict()
@@ -32,11 +36,11 @@ async def get_save_meta(title_id: str):
 async def download_save_raw(title_id: str):
     """Download raw save file (first file only) - for DS client compatibility."""
     title_id = _validate_title_id(title_id)
-    meta = storage.get_metadata(title_id)
+    meta = await asyncio.to_thread(storage.get_metadata, title_id)
     if meta is None:
         raise HTTPException(status_code=404, detail="No save found for this title")
 
-    files = storage.load_save_files(title_id)
+    files = await asyncio.to_thread(storage.load_save_files, title_id)
     if files is None or len(files) == 0:
         raise HTTPException(status_code=404, detail="Save data missing on disk")
 
@@ -47,7 +51,7 @@ async def download_save_raw(title_id: str):
         media_type="application/octet-stream",
         headers={
             "X-Save-Timestamp": str(meta.client_timestamp),
-            "X-Save-Hash": meta.save_hash,
+            "X-Save-Hash": meta.save_hash.hex(),
             "X-Save-Size": str(len(data)),
             "X-Save-Path": path,
         },
@@ -57,41 +61,42 @@ async def download_save_raw(title_id: str):
 @router.get("/saves/{title_id}")
 async def download_save(title_id: str):
     title_id = _validate_title_id(title_id)
-    meta = storage.get_metadata(title_id)
+    meta = await asyncio.to_thread(storage.get_metadata, title_id)
     if meta is None:
         raise HTTPException(status_code=404, detail="No save found for this title")
 
-    files = storage.load_save_files(title_id)
-    if files is None:
-        raise HTTPException(status_code=404, detail="Save data missing on disk")
+    headers = {
+        "X-Save-Timestamp": str(meta.client_timestamp),
+        "X-Save-Hash": meta.save_hash.hex(),
+        "X-Save-Size": str(meta.save_size),
+    }
 
-    # Build a bundle from stored files
-    bundle_files = []
-    for path, data in files:
-        bundle_files.append(
-            BundleFile(
-                path=path,
-                size=len(data),
-                sha256=hashlib.sha256(data).digest(),
-                data=data,
-            )
+    # Serve the bundle written at upload time as-is (sendfile, no Python copies)
+    bundle_path = await asyncio.to_thread(storage.get_bundle_path, title_id)
+    if bundle_path is not None:
+        return FileResponse(
+            bundle_path, media_type="application/octet-stream", headers=headers
         )
 
-    bundle = SaveBundle(
-        title_id=int(title_id, 16),
-        timestamp=meta.client_timestamp,
-        files=bundle_files,
-    )
+    # Saves stored before bundles were persisted: build one from the files
+    files = await asyncio.to_thread(storage.list_save_files, title_id)
+    if files is None:
+        raise HTTPException(status_code=404, detail="Save data missing on disk")
 
-    bundle_data = create_bundle(bundle)
-    return Response(
-        content=bundle_data,
+    # Reuse per-file hashes recorded at upload instead of rehashing on disk
+    known_hashes = {
+        entry["path"]: (entry["size"], bytes.fromhex(entry["sha256"]))
+        for entry in meta.files
+    }
+
+    # Stream the bundle straight from disk instead of building it in memory
+    return StreamingResponse(
+        stream_bundle(
+            int(title_id, 16), meta.client_timestamp, files,
+            known_hashes=known_hashes,
+        ),
         media_type="application/octet-stream",
-        headers={
-            "X-Save-Timestamp": str(meta.client_timestamp),
-            "X-Save-Hash": meta.save_hash,
-            "X-Save-Size": str(meta.save_size),
-        },
+        headers=headers,
     )
 
 
@@ -107,12 +112,9 @@ async def upload_save(
     # Get console ID from header
     console_id = request.headers.get("X-Console-ID", "")
 
-    body = await request.body()
-    if not body:
-        raise HTTPException(status_code=400, detail="Empty request body")
-
+    # Parse and hash the body as it streams in rather than buffering it first
     try:
-        bundle = parse_bundle(body)
+        bundle = await parse_bundle_stream(request.stream())
     except BundleError as e:
         raise HTTPException(status_code=400, detail=f"Invalid bundle: {e}")
 
@@ -125,22 +127,24 @@ async def upload_save(
 
     # Conflict check
     if not force:
-        existing = storage.get_metadata(title_id)
+        existing = await asyncio.to_thread(storage.get_metadata, title_id)
         if existing and existing.client_timestamp >= bundle.timestamp:
             raise HTTPException(
                 status_code=409,
                 detail="Server has a newer or equal save. Use ?force=true to override.",
                 headers={
                     "X-Server-Timestamp": str(existing.client_timestamp),
-                    "X-Server-Hash": existing.save_hash,
+                    "X-Server-Hash": existing.save_hash.hex(),
                 },
             )
 
-    meta = storage.store_save(bundle, source=source, console_id=console_id)
+    meta = await asyncio.to_thread(
+        storage.store_save, bundle, source=source, console_id=console_id
+    )
     return {
         "status": "ok",
         "timestamp": meta.last_sync,
-        "sha256": meta.save_hash,
+        "sha256": meta.save_hash.hex(),
     }
 
 
@@ -180,20 +184,22 @@ async def upload_save_raw(
     
     # Conflict check
     if not force:
-        existing = storage.get_metadata(title_id)
+        existing = await asyncio.to_thread(storage.get_metadata, title_id)
         if existing and existing.client_timestamp >= timestamp:
             raise HTTPException(
                 status_code=409,
                 detail="Server has a newer or equal save. Use ?force=true to override.",
                 headers={
                     "X-Server-Timestamp": str(existing.client_timestamp),
-                    "X-Server-Hash": existing.save_hash,
+                    "X-Server-Hash": existing.save_hash.hex(),
                 },
             )
     
-    meta = storage.store_save(bundle, source="nds", console_id=console_id)
+    meta = await asyncio.to_thread(
+        storage.store_save, bundle, source="nds", console_id=console_id
+    )
     return {
         "status": "ok",
         "timestamp": meta.last_sync,
-        "sha256": meta.save_hash,
+        "sha256": meta.save_hash.hex(),
     }
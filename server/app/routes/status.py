@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter
 
 from app.services import storage
@@ -7,7 +9,7 @@ router = APIRouter()
 
 @router.get("/status")
 async def get_status():
-    titles = storage.list_titles()
+    titles = await asyncio.to_thread(storage.list_titles)
     return {
         "status": "ok",
         "version": "1.0.0",
@@ -1,102 +1,124 @@
-from fastapi import APIRouter
+import asyncio
 
-from app.models.save import ConflictInfo, SyncPlan, SyncRequest
+from fastapi import APIRouter, Request
+
+from app.models.save import (
+    SaveMetadata,
+    SyncPlan,
+    SyncRequest,
+    TitleSyncInfo,
+)
+from app.request_body import decode_body, openapi_request_body
+from app.responses import ORJSONResponse
 from app.services import storage
 
 router = APIRouter()
 
 
-def _add_conflict(
-    conflict_list: list[str],
-    conflict_info: list[ConflictInfo],
-    title_id: str,
-    server_meta,
-    client_hash: str,
-    client_size: int,
+def _hash_key(value: str) -> bytes | str:
+    """Decode a client-sent hex hash to raw bytes for comparison.
+
+    Server hashes are held as raw digests; a value that isn't valid hex
+    can never match one, so it is kept as-is and only compares equal to
+    the identical string.
+    """
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        return value
+
+
+def _conflict_info(
+    title: TitleSyncInfo,
+    server_meta: SaveMetadata,
     console_id: str | None,
-) -> None:
-    """Add a conflict with detailed info."""
-    conflict_list.append(title_id)
+) -> dict:
+    """Build conflict details for a title (shaped like ConflictInfo)."""
     same_console = bool(console_id and server_meta.console_id == console_id)
-    conflict_info.append(
-        ConflictInfo(
-            title_id=title_id,
-            server_hash=server_meta.save_hash,
-            server_size=server_meta.save_size,
-            server_timestamp=server_meta.server_timestamp,
-            server_console_id=server_meta.console_id or "unknown",
-            client_hash=client_hash,
-            client_size=client_size,
-            same_console=same_console,
-        )
-    )
-
-
-@router.post("/sync")
-async def sync(request: SyncRequest) -> SyncPlan:
+    return {
+        "title_id": title.title_id,
+        "server_hash": server_meta.save_hash.hex(),
+        "server_size": server_meta.save_size,
+        "server_timestamp": server_meta.server_timestamp,
+        "server_console_id": server_meta.console_id or "unknown",
+        "client_hash": title.save_hash,
+        "client_size": title.size,
+        "same_console": same_console,
+    }
+
+
+@router.post(
+    "/sync",
+    response_model=SyncPlan,
+    # The body is read from the raw request, so describe it for the docs here
+    openapi_extra=openapi_request_body(SyncRequest),
+)
+async def sync(raw_request: Request) -> ORJSONResponse:
     """Compare 3DS title metadata against server state and return a sync plan."""
+    # Decode with msgspec rather than Pydantic: requests can carry hundreds of titles
+    request = decode_body(await raw_request.body(), SyncRequest)
+
     upload: list[str] = []
     download: list[str] = []
-    conflict: list[str] = []
-    conflict_info: list[ConflictInfo] = []
     up_to_date: list[str] = []
+    conflicts: list[tuple[TitleSyncInfo, SaveMetadata]] = []
 
-    client_title_ids = set()
     console_id = request.console_id
 
+    # Load all server metadata in one pass instead of one lookup per title
+    server_titles = await asyncio.to_thread(storage.list_metadata)
+    client_title_ids = {title.title_id for title in request.titles}
+
     for title in request.titles:
-        client_title_ids.add(title.title_id)
-        server_meta = storage.get_metadata(title.title_id)
+        tid = title.title_id
+        server_meta = server_titles.get(tid)
 
         if server_meta is None:
             # Server has no save for this title -> 3DS should upload
-            upload.append(title.title_id)
+            upload.append(tid)
             continue
 
-        if title.save_hash == server_meta.save_hash:
-            up_to_date.append(title.title_id)
+        server_hash = server_meta.save_hash
+        client_hash = _hash_key(title.save_hash)
+        if client_hash == server_hash:
+            up_to_date.append(tid)
             continue
 
         # Hashes differ -> use three-way comparison with last_synced_hash
-        if title.last_synced_hash is not None:
-            if title.last_synced_hash == server_meta.save_hash:
+        last_synced = title.last_synced_hash
+        if last_synced is not None:
+            last_synced = _hash_key(last_synced)
+            if last_synced == server_hash:
                 # Server unchanged since last sync, only client changed -> upload
-                upload.append(title.title_id)
-            elif title.last_synced_hash == title.save_hash:
+                upload.append(tid)
+            elif last_synced == client_hash:
                 # Client unchanged since last sync, only server changed -> download
-                download.append(title.title_id)
+                download.append(tid)
             else:
                 # Both changed since last sync -> true conflict
-                _add_conflict(
-                    conflict, conflict_info, title.title_id,
-                    server_meta, title.save_hash, title.size, console_id
-                )
+                conflicts.append((title, server_meta))
+        elif console_id and server_meta.console_id == console_id:
+            # No sync history - first time syncing this title on this console.
+            # Server version was uploaded by THIS console (our previous session),
+            # so we can safely auto-download (we have old local data)
+            download.append(tid)
         else:
-            # No sync history - first time syncing this title on this console
-            # If server version was uploaded by THIS console, we can safely download
-            # (our previous session on this console uploaded it)
-            if console_id and server_meta.console_id == console_id:
-                # Same console uploaded it before -> auto-download (we have old local data)
-                download.append(title.title_id)
-            else:
-                # Different console or unknown -> need user decision
-                _add_conflict(
-                    conflict, conflict_info, title.title_id,
-                    server_meta, title.save_hash, title.size, console_id
-                )
-
-    # Find titles that exist only on the server
-    server_only: list[str] = []
-    for meta in storage.list_titles():
-        tid = meta["title_id"]
-        if tid not in client_title_ids:
-            server_only.append(tid)
-
-    return SyncPlan(
-        upload=upload,
-        download=download,
-        conflict=conflict,
-        up_to_date=up_to_date,
-        server_only=server_only,
-        conflict_info=conflict_info,
-    )
+            # No sync history, different console or unknown -> need user decision
+            conflicts.append((title, server_meta))
+
+    # Find titles that exist only on the server (keeps server's sorted order)
+    server_only = [tid for tid in server_titles if tid not in client_title_ids]
+
+    # Return the plan as a plain dict: SyncPlan only documents the schema,
+    # it isn't constructed or validated on the way out
+    return ORJSONResponse({
+        "upload": upload,
+        "download": download,
+        "conflict": [title.title_id for title, _ in conflicts],
+        "up_to_date": up_to_date,
+        "server_only": server_only,
+        "conflict_info": [
+            _conflict_info(title, server_meta, console_id)
+            for title, server_meta in conflicts
+        ],
+    })
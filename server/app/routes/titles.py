@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter
 from pydantic import BaseModel
 
@@ -12,7 +14,7 @@ class NameLookupRequest(BaseModel):
 
 @router.get("/titles")
 async def list_titles():
-    titles = storage.list_titles()
+    titles = await asyncio.to_thread(storage.list_titles)
     return {"titles": titles}
 
 
@@ -1,8 +1,14 @@
 """Update checking endpoint - proxies GitHub releases for 3DS/NDS clients."""
 
-from fastapi import APIRouter
+import asyncio
+import time
+from functools import lru_cache
+
+from fastapi import APIRouter, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import httpx
+from starlette.background import BackgroundTask
 
 router = APIRouter()
 
@@ -12,6 +18,14 @@ GITHUB_OWNER = "pepasjc"
 GITHUB_REPO = "3ds_sync"
 GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/latest"
 
+# Cache the latest release briefly so polling clients don't each hit GitHub
+RELEASE_CACHE_TTL = 120.0  # seconds
+_release_cache: tuple[float, dict] | None = None
+_release_lock = asyncio.Lock()
+
+# Chunk size when streaming release binaries through to clients
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 # Map platform to expected asset file extension
 PLATFORM_EXTENSIONS = {
     "3ds": ".cia",
@@ -29,7 +43,9 @@ class UpdateInfo(BaseModel):
 
 
 @router.get("/update/check")
-async def check_update(current: str = "0.0.0", platform: str = "3ds") -> UpdateInfo:
+async def check_update(
+    request: Request, current: str = "0.0.0", platform: str = "3ds"
+) -> UpdateInfo:
     """Check if a newer version is available.
 
     Args:
@@ -42,88 +58,123 @@ async def check_update(current: str = "0.0.0", platform: str = "3ds") -> UpdateI
     extension = PLATFORM_EXTENSIONS.get(platform, ".cia")
 
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                GITHUB_API_URL,
-                headers={"Accept": "application/vnd.github.v3+json"},
-                timeout=10.0,
-            )
-
-            if resp.status_code != 200:
-                return UpdateInfo(available=False, current_version=current)
-
-            data = resp.json()
-            latest_version = data.get("tag_name", "").lstrip("v")
-
-            # Find asset matching the platform extension
-            download_url = None
-            file_size = None
-            for asset in data.get("assets", []):
-                if asset["name"].endswith(extension):
-                    download_url = asset["browser_download_url"]
-                    file_size = asset["size"]
-                    break
-
-            # Compare versions
-            is_newer = _compare_versions(latest_version, current) > 0
-
-            return UpdateInfo(
-                available=is_newer and download_url is not None,
-                current_version=current,
-                latest_version=latest_version,
-                download_url=download_url,
-                changelog=data.get("body", ""),
-                file_size=file_size,
-            )
+        data = await _get_latest_release(request.app.state.http)
+        if data is None:
+            return UpdateInfo(available=False, current_version=current)
+
+        latest_version = data.get("tag_name", "").lstrip("v")
+
+        # Find asset matching the platform extension
+        download_url = None
+        file_size = None
+        for asset in data.get("assets", []):
+            if asset["name"].endswith(extension):
+                download_url = asset["browser_download_url"]
+                file_size = asset["size"]
+                break
+
+        # Compare versions
+        is_newer = _compare_versions(latest_version, current) > 0
+
+        return UpdateInfo(
+            available=is_newer and download_url is not None,
+            current_version=current,
+            latest_version=latest_version,
+            download_url=download_url,
+            changelog=data.get("body", ""),
+            file_size=file_size,
+        )
 
     except Exception:
         # On any error, report no update available
         return UpdateInfo(available=False, current_version=current)
 
 
+async def _get_latest_release(client: httpx.AsyncClient) -> dict | None:
+    """Return the latest GitHub release JSON, cached for RELEASE_CACHE_TTL seconds.
+
+    Returns None if GitHub didn't answer with 200 (not cached, so the next
+    check retries).
+    """
+    global _release_cache
+
+    if _release_cache and time.monotonic() - _release_cache[0] < RELEASE_CACHE_TTL:
+        return _release_cache[1]
+
+    async with _release_lock:
+        # Another request may have refreshed the cache while we waited
+        if _release_cache and time.monotonic() - _release_cache[0] < RELEASE_CACHE_TTL:
+            return _release_cache[1]
+
+        resp = await client.get(
+            GITHUB_API_URL,
+            headers={"Accept": "application/vnd.github.v3+json"},
+            timeout=10.0,
+        )
+
+        if resp.status_code != 200:
+            return None
+
+        data = resp.json()
+        _release_cache = (time.monotonic(), data)
+        return data
+
+
 @router.get("/update/download")
-async def proxy_download(url: str):
+async def proxy_download(request: Request, url: str):
     """Proxy download from GitHub (3DS/NDS can't do HTTPS with GitHub).
 
-    Downloads the full file then returns it with Content-Length,
-    which is required by the DS client's HTTP/1.0 implementation.
-    Homebrew binaries are small (a few MB) so this is fine.
+    The DS client's HTTP/1.0 implementation requires Content-Length, so the
+    body is streamed through with the upstream length when GitHub sends one.
+    Otherwise (or if the body is content-encoded, making the upstream length
+    differ from the decoded size) the file is buffered to measure it.
     """
-    from fastapi.responses import Response
-
     filename = url.rsplit("/", 1)[-1] if "/" in url else "update"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, follow_redirects=True, timeout=300.0)
+    client = request.app.state.http
+    upstream = await client.send(
+        client.build_request("GET", url, timeout=300.0),
+        stream=True,
+        follow_redirects=True,
+    )
 
-    return Response(
-        content=resp.content,
+    content_length = upstream.headers.get("content-length")
+    if content_length is None or "content-encoding" in upstream.headers:
+        try:
+            content = await upstream.aread()
+        finally:
+            await upstream.aclose()
+        headers["Content-Length"] = str(len(content))
+        return Response(
+            content=content,
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    headers["Content-Length"] = content_length
+    return StreamingResponse(
+        upstream.aiter_bytes(DOWNLOAD_CHUNK_SIZE),
         media_type="application/octet-stream",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}",
-            "Content-Length": str(len(resp.content)),
-        },
+        headers=headers,
+        background=BackgroundTask(upstream.aclose),
     )
 
 
+@lru_cache(maxsize=256)
+def _parse_version(v: str) -> tuple[int, ...]:
+    """Parse a dotted version into a tuple, dropping trailing zeros so
+    "1.2" and "1.2.0" compare equal."""
+    try:
+        parts = [int(x) for x in v.split(".")]
+    except ValueError:
+        parts = [0]
+    while parts and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
 def _compare_versions(v1: str, v2: str) -> int:
     """Compare two version strings. Returns >0 if v1 > v2, <0 if v1 < v2, 0 if equal."""
-    def parse(v: str) -> list[int]:
-        try:
-            return [int(x) for x in v.split(".")]
-        except ValueError:
-            return [0]
-
-    p1, p2 = parse(v1), parse(v2)
-    # Pad to same length
-    while len(p1) < len(p2):
-        p1.append(0)
-    while len(p2) < len(p1):
-        p2.append(0)
-
-    for a, b in zip(p1, p2):
-        if a > b:
-            return 1
-        if a < b:
-            return -1
-    return 0
+    p1, p2 = _parse_version(v1), _parse_version(v2)
+    return (p1 > p2) - (p1 < p2)
@@ -29,8 +29,13 @@ Bundle format v2 (compressed):
 from __future__ import annotations
 
 import hashlib
+import os
 import struct
 import zlib
+from collections.abc import AsyncIterator, Iterator
+from contextlib import ExitStack
+from pathlib import Path
+from typing import BinaryIO
 
 from app.models.save import (
     BUNDLE_MAGIC,
@@ -40,99 +45,136 @@ from app.models.save import (
     SaveBundle,
 )
 
+try:
+    import deflate  # libdeflate bindings: same zlib streams, faster codec
+except ImportError:  # optional: falls back to the stdlib zlib module
+    deflate = None
+
+
+# Chunk size used when streaming file data into a bundle
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# libdeflate level for v2 bundles when the deflate package is installed
+# (better ratio than zlib-6 at similar or faster speed)
+LIBDEFLATE_LEVEL = 9
+
+
+# Fixed 28-byte header: magic, version, title ID (raw, big-endian),
+# timestamp, file count, size field
+_HEADER = struct.Struct("<4sI8sIII")
+# File table entry pieces around the variable-length path
+_PATH_LEN = struct.Struct("<H")
+_SIZE_HASH = struct.Struct("<I32s")
+
 
 class BundleError(Exception):
     pass
 
 
-def _parse_payload(data: bytes, file_count: int) -> list[BundleFile]:
+_DECOMPRESS_ERRORS: tuple[type[Exception], ...] = (zlib.error,)
+if deflate is not None:
+    _DECOMPRESS_ERRORS += (deflate.DeflateError,)
+
+
+def _zlib_compress(payload: bytes) -> bytes:
+    if deflate is not None:
+        return deflate.zlib_compress(payload, LIBDEFLATE_LEVEL)
+    return zlib.compress(payload, level=6)
+
+
+def _zlib_decompress(data: bytes, size: int) -> bytes:
+    if deflate is not None:
+        # libdeflate needs the output size up front; the header has it
+        return deflate.zlib_decompress(data, size)
+    return zlib.decompress(data)
+
+
+def _parse_payload(data: bytes | memoryview, file_count: int) -> list[BundleFile]:
     """Parse the file table and file data from payload bytes."""
     offset = 0
+    data_len = len(data)
+    view = memoryview(data)
     files: list[BundleFile] = []
 
-    # File table
+    # File table - paths are decoded straight from the view, no slice copies
     for _ in range(file_count):
-        if offset + 2 > len(data):
+        if offset + 2 > data_len:
             raise BundleError("Truncated file table")
 
-        (path_len,) = struct.unpack_from("<H", data, offset)
+        (path_len,) = _PATH_LEN.unpack_from(data, offset)
         offset += 2
 
-        if offset + path_len > len(data):
+        if offset + path_len > data_len:
             raise BundleError("Truncated file path")
-        path = data[offset : offset + path_len].decode("utf-8")
+        try:
+            path = str(view[offset : offset + path_len], "utf-8")
+        except UnicodeDecodeError:
+            raise BundleError("Invalid file path encoding")
         offset += path_len
 
-        if offset + 4 > len(data):
-            raise BundleError("Truncated file size")
-        (file_size,) = struct.unpack_from("<I", data, offset)
-        offset += 4
-
-        if offset + 32 > len(data):
+        if offset + _SIZE_HASH.size > data_len:
+            if offset + 4 > data_len:
+                raise BundleError("Truncated file size")
             raise BundleError("Truncated file hash")
-        sha256 = data[offset : offset + 32]
-        offset += 32
+        file_size, sha256 = _SIZE_HASH.unpack_from(data, offset)
+        offset += _SIZE_HASH.size
 
         files.append(BundleFile(path=path, size=file_size, sha256=sha256))
 
-    # File data
+    # File data - hash straight from views over the payload, no slice copies;
+    # verified files keep their view instead of a bytes copy
     for f in files:
-        if offset + f.size > len(data):
+        if offset + f.size > data_len:
             raise BundleError(f"Truncated file data for {f.path}")
-        f.data = data[offset : offset + f.size]
+        file_view = view[offset : offset + f.size]
         offset += f.size
 
-        # Verify hash
-        actual_hash = hashlib.sha256(f.data).digest()
+        actual_hash = hashlib.sha256(file_view).digest()
         if actual_hash != f.sha256:
             raise BundleError(
                 f"Hash mismatch for {f.path}: "
                 f"expected {f.sha256.hex()}, got {actual_hash.hex()}"
             )
+        f.data = file_view
 
     return files
 
 
-def parse_bundle(data: bytes) -> SaveBundle:
-    """Parse a binary save bundle into a SaveBundle object.
+def _parse_header(data: bytes) -> tuple[int, int, int, int, int]:
+    """Parse and validate the 28-byte header.
 
-    Supports both v1 (uncompressed) and v2 (zlib compressed) formats.
+    Returns (version, title_id, timestamp, file_count, size_field).
     """
-    if len(data) < 28:
+    if len(data) < _HEADER.size:
         raise BundleError("Bundle too small for header")
 
-    offset = 0
-
-    # Header
-    magic = data[offset : offset + 4]
+    magic, version, title_id, timestamp, file_count, size_field = _HEADER.unpack_from(data)
     if magic != BUNDLE_MAGIC:
         raise BundleError(f"Invalid magic: {magic!r}")
-    offset += 4
-
-    (version,) = struct.unpack_from("<I", data, offset)
     if version not in (BUNDLE_VERSION, BUNDLE_VERSION_COMPRESSED):
         raise BundleError(f"Unsupported version: {version}")
-    offset += 4
 
-    (title_id,) = struct.unpack_from(">Q", data, offset)
-    offset += 8
+    # Title ID is the only big-endian field
+    return version, int.from_bytes(title_id, "big"), timestamp, file_count, size_field
 
-    (timestamp,) = struct.unpack_from("<I", data, offset)
-    offset += 4
 
-    (file_count,) = struct.unpack_from("<I", data, offset)
-    offset += 4
+def parse_bundle(data: bytes) -> SaveBundle:
+    """Parse a binary save bundle into a SaveBundle object.
 
-    (size_field,) = struct.unpack_from("<I", data, offset)
-    offset += 4
+    Supports v1 (uncompressed) and v2 (zlib compressed) formats. File
+    data comes back as memoryviews into the input (v1) or decompressed
+    payload; BundleFile.materialize() copies it out when independent
+    bytes are needed.
+    """
+    version, title_id, timestamp, file_count, size_field = _parse_header(data)
+    offset = _HEADER.size
 
     # Get payload (compressed or not)
-    if version == BUNDLE_VERSION_COMPRESSED:
+    if version != BUNDLE_VERSION:
         # v2: decompress payload
-        compressed_payload = data[offset:]
         try:
-            payload = zlib.decompress(compressed_payload)
-        except zlib.error as e:
+            payload = _zlib_decompress(memoryview(data)[offset:], size_field)
+        except _DECOMPRESS_ERRORS as e:
             raise BundleError(f"Decompression failed: {e}")
 
         if len(payload) != size_field:
@@ -141,62 +183,305 @@ def parse_bundle(data: bytes) -> SaveBundle:
             )
     else:
         # v1: payload is uncompressed
-        payload = data[offset:]
+        payload = memoryview(data)[offset:]
 
     files = _parse_payload(payload, file_count)
 
     return SaveBundle(title_id=title_id, timestamp=timestamp, files=files)
 
 
-def _build_payload(bundle: SaveBundle) -> bytes:
-    """Build the file table + file data payload."""
-    parts: list[bytes] = []
+class _PayloadParser:
+    """Incremental parser for the file table + file data payload.
+
+    Payload bytes are fed in arbitrary chunks; each file's hash is updated
+    as its data arrives, so no second pass over the payload is needed.
+    """
+
+    def __init__(self, file_count: int) -> None:
+        self.file_count = file_count
+        self.files: list[BundleFile] = []
+        self._buf = bytearray()
+        self._index = 0  # file currently receiving data
+        self._data = bytearray()
+        self._received = 0
+        self._hasher = hashlib.sha256()
+
+    def feed(self, chunk: bytes) -> None:
+        self._buf += chunk
+        offset = self._parse_table() if len(self.files) < self.file_count else 0
+        offset = self._parse_data(offset)
+        del self._buf[:offset]
+
+    def _parse_table(self) -> int:
+        buf = self._buf
+        offset = 0
+        while len(self.files) < self.file_count:
+            if offset + 2 > len(buf):
+                break
+            (path_len,) = _PATH_LEN.unpack_from(buf, offset)
+            entry_end = offset + 2 + path_len + _SIZE_HASH.size
+            if entry_end > len(buf):
+                break
+            try:
+                path = buf[offset + 2 : offset + 2 + path_len].decode("utf-8")
+            except UnicodeDecodeError:
+                raise BundleError("Invalid file path encoding")
+            file_size, sha256 = _SIZE_HASH.unpack_from(buf, offset + 2 + path_len)
+            self.files.append(BundleFile(path=path, size=file_size, sha256=sha256))
+            offset = entry_end
+        return offset
+
+    def _parse_data(self, offset: int) -> int:
+        if len(self.files) < self.file_count:
+            return offset
+
+        # The view is released on exit so feed() can trim the buffer afterwards
+        with memoryview(self._buf) as buf:
+            while self._index < self.file_count:
+                f = self.files[self._index]
+                take = min(f.size - self._received, len(buf) - offset)
+                if take > 0:
+                    # Hash and copy straight from the buffer, no intermediate bytes
+                    with buf[offset : offset + take] as part:
+                        self._data += part
+                        self._hasher.update(part)
+                    self._received += take
+                    offset += take
+                if self._received < f.size:
+                    break
+
+                # Verify hash
+                actual_hash = self._hasher.digest()
+                if actual_hash != f.sha256:
+                    raise BundleError(
+                        f"Hash mismatch for {f.path}: "
+                        f"expected {f.sha256.hex()}, got {actual_hash.hex()}"
+                    )
+                f.data = memoryview(self._data)
+                self._index += 1
+                self._data = bytearray()
+                self._received = 0
+                self._hasher = hashlib.sha256()
+        return offset
+
+    def finish(self) -> list[BundleFile]:
+        if len(self.files) < self.file_count:
+            raise BundleError("Truncated file table")
+        if self._index < self.file_count:
+            raise BundleError(f"Truncated file data for {self.files[self._index].path}")
+        return self.files
+
+
+async def parse_bundle_stream(stream: AsyncIterator[bytes]) -> SaveBundle:
+    """Parse a save bundle from an async byte stream (e.g. request.stream()).
+
+    Same formats and checks as parse_bundle, but the compressed payload is
+    inflated and hashed chunk by chunk as it arrives instead of buffering
+    the whole body first.
+    """
+    header = bytearray()
+    parser: _PayloadParser | None = None
+    decompressor = None
+    payload_size = 0
+
+    async for chunk in stream:
+        if parser is None:
+            header += chunk
+            if len(header) < _HEADER.size:
+                continue
+            version, title_id, timestamp, file_count, size_field = _parse_header(header)
+            parser = _PayloadParser(file_count)
+            if version == BUNDLE_VERSION_COMPRESSED:
+                decompressor = zlib.decompressobj()
+            chunk = bytes(header[_HEADER.size:])
+
+        if decompressor is not None:
+            try:
+                chunk = decompressor.decompress(chunk)
+            except _DECOMPRESS_ERRORS as e:
+                raise BundleError(f"Decompression failed: {e}")
+            payload_size += len(chunk)
+            if payload_size > size_field:
+                raise BundleError(
+                    f"Decompressed size mismatch: expected {size_field}, got more"
+                )
+        parser.feed(chunk)
+
+    if parser is None:
+        # Raises for empty or short bodies
+        _parse_header(header)
+
+    if decompressor is not None:
+        try:
+            tail = decompressor.flush()
+        except _DECOMPRESS_ERRORS as e:
+            raise BundleError(f"Decompression failed: {e}")
+        if not decompressor.eof:
+            raise BundleError("Decompression failed: incomplete or truncated stream")
+        payload_size += len(tail)
+        if payload_size != size_field:
+            raise BundleError(
+                f"Decompressed size mismatch: expected {size_field}, got {payload_size}"
+            )
+        parser.feed(tail)
+
+    files = parser.finish()
+
+    return SaveBundle(title_id=title_id, timestamp=timestamp, files=files)
+
+
+def _pack_header(version: int, title_id: int, timestamp: int, file_count: int, size: int) -> bytes:
+    """Pack the fixed 28-byte bundle header."""
+    # Title ID is the only big-endian field, so it goes in as raw bytes
+    return _HEADER.pack(
+        BUNDLE_MAGIC, version, title_id.to_bytes(8, "big"), timestamp, file_count, size
+    )
+
+
+def _pack_file_entry(path: str, size: int, sha256: bytes) -> bytes:
+    """Pack a single file table entry."""
+    path_bytes = path.encode("utf-8")
+    return b"".join((
+        _PATH_LEN.pack(len(path_bytes)),
+        path_bytes,
+        _SIZE_HASH.pack(size, sha256),
+    ))
+
+
+def _build_payload(bundle: SaveBundle, reserve: int = 0, data_hasher=None) -> bytearray:
+    """Build the file table + file data payload.
+
+    Everything is written into one preallocated buffer. The first `reserve`
+    bytes are left zeroed so a header can be filled in without another copy.
+    If data_hasher is given, each file's data is fed to it as it's copied.
+    """
+    paths = [f.path.encode("utf-8") for f in bundle.files]
+    size = reserve + sum(
+        2 + len(path_bytes) + 4 + 32 + len(f.data)
+        for path_bytes, f in zip(paths, bundle.files)
+    )
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = reserve
 
     # File table
-    for f in bundle.files:
-        path_bytes = f.path.encode("utf-8")
-        parts.append(struct.pack("<H", len(path_bytes)))
-        parts.append(path_bytes)
-        parts.append(struct.pack("<I", f.size))
-        parts.append(f.sha256)
+    for path_bytes, f in zip(paths, bundle.files):
+        _PATH_LEN.pack_into(buf, offset, len(path_bytes))
+        offset += _PATH_LEN.size
+        view[offset : offset + len(path_bytes)] = path_bytes
+        offset += len(path_bytes)
+        _SIZE_HASH.pack_into(buf, offset, f.size, f.sha256)
+        offset += _SIZE_HASH.size
 
     # File data
     for f in bundle.files:
-        parts.append(f.data)
+        view[offset : offset + len(f.data)] = f.data
+        offset += len(f.data)
+        if data_hasher is not None:
+            data_hasher.update(f.data)
 
-    return b"".join(parts)
+    return buf
 
 
-def create_bundle(bundle: SaveBundle, compress: bool = True) -> bytes:
+def create_bundle(
+    bundle: SaveBundle,
+    compress: bool = True,
+    data_hasher=None,
+) -> bytes:
     """Serialize a SaveBundle into the binary bundle format.
 
     Args:
         bundle: The save bundle to serialize.
         compress: If True, create a v2 compressed bundle. If False, create v1.
+        data_hasher: Optional hashlib object updated with every file's data
+            in order, so callers get the save hash without a second pass.
     """
-    payload = _build_payload(bundle)
-
-    parts: list[bytes] = []
-
-    # Header
-    parts.append(BUNDLE_MAGIC)
-
-    if compress:
-        # v2 compressed format
-        compressed_payload = zlib.compress(payload, level=6)
-        parts.append(struct.pack("<I", BUNDLE_VERSION_COMPRESSED))
-        parts.append(struct.pack(">Q", bundle.title_id))
-        parts.append(struct.pack("<I", bundle.timestamp))
-        parts.append(struct.pack("<I", len(bundle.files)))
-        parts.append(struct.pack("<I", len(payload)))  # uncompressed size
-        parts.append(compressed_payload)
-    else:
-        # v1 uncompressed format
-        parts.append(struct.pack("<I", BUNDLE_VERSION))
-        parts.append(struct.pack(">Q", bundle.title_id))
-        parts.append(struct.pack("<I", bundle.timestamp))
-        parts.append(struct.pack("<I", len(bundle.files)))
-        parts.append(struct.pack("<I", bundle.total_size))
-        parts.append(payload)
-
-    return b"".join(parts)
+    if not compress:
+        # v1 uncompressed format: header is written into the payload buffer
+        buf = _build_payload(bundle, reserve=_HEADER.size, data_hasher=data_hasher)
+        buf[:_HEADER.size] = _pack_header(
+            BUNDLE_VERSION, bundle.title_id, bundle.timestamp,
+            len(bundle.files), bundle.total_size,
+        )
+        return bytes(buf)
+
+    payload = _build_payload(bundle, data_hasher=data_hasher)
+
+    # v2 compressed format
+    compressed_payload = _zlib_compress(payload)
+    header = _pack_header(
+        BUNDLE_VERSION_COMPRESSED, bundle.title_id, bundle.timestamp,
+        len(bundle.files), len(payload),  # uncompressed size
+    )
+    return header + compressed_payload
+
+
+def _read_chunks(fp: BinaryIO, size: int) -> Iterator[bytes]:
+    """Read exactly size bytes from fp in STREAM_CHUNK_SIZE pieces."""
+    while size > 0:
+        chunk = fp.read(min(size, STREAM_CHUNK_SIZE))
+        if not chunk:
+            raise BundleError(f"File shrank while streaming: {fp.name}")
+        size -= len(chunk)
+        yield chunk
+
+
+def stream_bundle(
+    title_id: int,
+    timestamp: int,
+    files: list[tuple[str, Path]],
+    compress: bool = True,
+    known_hashes: dict[str, tuple[int, bytes]] | None = None,
+) -> Iterator[bytes]:
+    """Serialize on-disk files into the bundle format chunk by chunk.
+
+    The file table needs every hash up front. Hashes recorded at upload
+    time can be passed as known_hashes ({path: (size, sha256)}); any other
+    file is hashed in a first streaming pass. File data is then read and
+    emitted in STREAM_CHUNK_SIZE pieces, keeping memory bounded regardless
+    of save size.
+
+    Every file is opened before anything is emitted and sizes come from the
+    open handles, so a store swapping in a new current/ meanwhile can't make
+    the data disagree with the header.
+    """
+    known_hashes = known_hashes or {}
+    with ExitStack() as stack:
+        entries: list[BundleFile] = []
+        handles: list[BinaryIO] = []
+        for path, file_path in files:
+            fp = stack.enter_context(open(file_path, "rb"))
+            size = os.fstat(fp.fileno()).st_size
+            known = known_hashes.get(path)
+            if known is not None and known[0] == size:
+                digest = known[1]
+            else:
+                digest = hashlib.file_digest(fp, "sha256").digest()
+                fp.seek(0)
+            entries.append(BundleFile(path=path, size=size, sha256=digest))
+            handles.append(fp)
+
+        table = b"".join(_pack_file_entry(f.path, f.size, f.sha256) for f in entries)
+        data_size = sum(f.size for f in entries)
+
+        if not compress:
+            yield _pack_header(BUNDLE_VERSION, title_id, timestamp, len(entries), data_size)
+            yield table
+            for f, fp in zip(entries, handles):
+                yield from _read_chunks(fp, f.size)
+            return
+
+        yield _pack_header(
+            BUNDLE_VERSION_COMPRESSED, title_id, timestamp,
+            len(entries), len(table) + data_size,
+        )
+        compressor = zlib.compressobj(level=6)
+        out = compressor.compress(table)
+        if out:
+            yield out
+        for f, fp in zip(entries, handles):
+            for chunk in _read_chunks(fp, f.size):
+                out = compressor.compress(chunk)
+                if out:
+                    yield out
+        yield compressor.flush()
@@ -1,5 +1,6 @@
 """Game name lookup service using 3dstdb.txt and dstdb.txt databases."""
 
+import sys
 from pathlib import Path
 
 # Global cache for game names (loaded once at startup)
@@ -7,15 +8,19 @@ from pathlib import Path
 _3ds_names: dict[str, str] = {}
 _ds_names: dict[str, str] = {}
 
+# Both databases merged once after loading with the duplicate-code priority baked in,
+# so a lookup is a single dict get instead of a get-with-fallback
+_merged_3ds_first: dict[str, str] = {}
+_merged_ds_first: dict[str, str] = {}
+
 
 def load_database(db_path: Path | None = None) -> int:
     """Load a game names database from file into the appropriate cache.
 
     Automatically detects whether it's loading a 3DS or DS database based on filename.
-    Returns the number of entries loaded.
+    Returns the number of entries loaded. Call rebuild_merged() once all
+    databases are loaded to make the new names visible to lookups.
     """
-    global _3ds_names, _ds_names
-
     if db_path is None:
         # Default path relative to server root
         db_path = Path(__file__).parent.parent.parent / "data" / "3dstdb.txt"
@@ -28,24 +33,55 @@ def load_database(db_path: Path | None = None) -> int:
     target_dict = _ds_names if is_ds else _3ds_names
 
     added = 0
-    with open(db_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or "," not in line:
-                continue
-
-            # Format: CODE,Game Name
-            parts = line.split(",", 1)
-            if len(parts) == 2:
-                code = parts[0].strip().upper()
-                name = parts[1].strip()
-                if code and name:
-                    target_dict[code] = name
-                    added += 1
+    # Read the whole file in one call; the databases are only a few hundred KB
+    for line in db_path.read_text(encoding="utf-8").splitlines():
+        # Format: CODE,Game Name
+        code, sep, name = line.partition(",")
+        if not sep:
+            continue
+
+        # Intern codes so both databases share one str per game code
+        code = sys.intern(code.strip().upper())
+        name = name.strip()
+        if code and name:
+            target_dict[code] = name
+            added += 1
 
     return added
 
 
+def rebuild_merged() -> None:
+    """Rebuild the merged lookup tables from the per-console databases."""
+    global _merged_3ds_first, _merged_ds_first
+
+    # Later entries win, so the preferred database goes last
+    _merged_3ds_first = {**_ds_names, **_3ds_names}
+    _merged_ds_first = {**_3ds_names, **_ds_names}
+
+
+def _extract_game_code(code_upper: str) -> str:
+    """Extract the 4-char game code from a normalized product code."""
+    if (
+        len(code_upper) >= 10
+        and code_upper[3] == "-"
+        and code_upper[5] == "-"
+        and code_upper.count("-") == 2
+    ):
+        # Fast path for the usual CTR-P-XXXX shape: slice instead of splitting
+        return code_upper[6:10]
+    if len(code_upper) >= 10 and "-" in code_upper:
+        # Full format like CTR-P-BRBE - extract last 4 chars before any suffix
+        parts = code_upper.split("-")
+        if len(parts) >= 3:
+            return parts[2][:4]  # Take first 4 chars of the game code part
+        return code_upper[-4:]
+    if len(code_upper) == 4:
+        # Already just the 4-char code
+        return code_upper
+    # Try last 4 chars as fallback
+    return code_upper[-4:] if len(code_upper) >= 4 else code_upper
+
+
 def lookup_names(product_codes: list[str]) -> dict[str, str]:
     """Look up game names for a list of product codes.
 
@@ -61,35 +97,15 @@ def lookup_names(product_codes: list[str]) -> dict[str, str]:
     Unknown codes are omitted from the result.
     """
     result = {}
+    merged_3ds_first = _merged_3ds_first
+    merged_ds_first = _merged_ds_first
 
     for code in product_codes:
-        # Extract the 4-char game code
         code_upper = code.upper().strip()
-        is_3ds_format = code_upper.startswith("CTR-")
-
-        if len(code_upper) >= 10 and "-" in code_upper:
-            # Full format like CTR-P-BRBE - extract last 4 chars before any suffix
-            parts = code_upper.split("-")
-            if len(parts) >= 3:
-                game_code = parts[2][:4]  # Take first 4 chars of the game code part
-            else:
-                game_code = code_upper[-4:]
-        elif len(code_upper) == 4:
-            # Already just the 4-char code
-            game_code = code_upper
-        else:
-            # Try last 4 chars as fallback
-            game_code = code_upper[-4:] if len(code_upper) >= 4 else code_upper
-
-        # Check appropriate database based on format
-        # For CTR- prefix, check 3DS first, then DS as fallback
-        # For short codes, check DS first, then 3DS as fallback
-        name = None
-        if is_3ds_format:
-            name = _3ds_names.get(game_code) or _ds_names.get(game_code)
-        else:
-            name = _ds_names.get(game_code) or _3ds_names.get(game_code)
 
+        # For CTR- prefix, 3DS entries win over DS ones; for short codes, DS wins
+        table = merged_3ds_first if code_upper.startswith("CTR-") else merged_ds_first
+        name = table.get(_extract_game_code(code_upper))
         if name:
             result[code] = name
 
@@ -3,6 +3,7 @@
 Saves are stored as:
   saves/<title_id>/
     metadata.json
+    bundle.bin        -- current save as a ready-to-send v2 bundle
     current/          -- extracted save files
     history/
       <timestamp>/    -- previous versions
@@ -10,14 +11,39 @@ Saves are stored as:
 
 from __future__ import annotations
 
-import json
 import hashlib
+import os
 import shutil
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
 
+import orjson
+
 from app.config import settings
 from app.models.save import SaveBundle, SaveMetadata
+from app.services.bundle import create_bundle
+
+# Parsed metadata by title ID, with the metadata.json mtime it was read at.
+# A stat per lookup is enough to tell whether the file needs re-parsing.
+_meta_cache: dict[str, tuple[int, SaveMetadata]] = {}
+_meta_cache_dir: Path | None = None
+
+# Routes run store_save in worker threads; serialize writers so two uploads
+# can't interleave archiving and rewriting the same title directory
+_store_lock = threading.Lock()
+
+# O_BINARY only exists (and matters) on Windows
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def _metadata_cache() -> dict[str, tuple[int, SaveMetadata]]:
+    """Return the metadata cache, resetting it if save_dir has changed."""
+    global _meta_cache_dir
+    if _meta_cache_dir != settings.save_dir:
+        _meta_cache.clear()
+        _meta_cache_dir = settings.save_dir
+    return _meta_cache
 
 
 def _title_dir(title_id: str) -> Path:
@@ -36,42 +62,122 @@ def _metadata_path(title_id: str) -> Path:
     return _title_dir(title_id) / "metadata.json"
 
 
+def _bundle_path(title_id: str) -> Path:
+    return _title_dir(title_id) / "bundle.bin"
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(path.name + ".tmp")
+
+
 def title_exists(title_id: str) -> bool:
     return _metadata_path(title_id).exists()
 
 
+def _load_metadata(title_id: str) -> SaveMetadata | None:
+    """Return parsed metadata for a title, re-reading it only if it changed."""
+    path = _metadata_path(title_id)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    cache = _metadata_cache()
+    cached = cache.get(title_id)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    data = orjson.loads(path.read_bytes())
+    meta = SaveMetadata.from_dict(data)
+    cache[title_id] = (mtime, meta)
+    return meta
+
+
 def list_titles() -> list[dict]:
     """Return metadata for all stored titles."""
-    results = []
+    return [meta.to_dict() for meta in list_metadata().values()]
+
+
+def list_metadata() -> dict[str, SaveMetadata]:
+    """Return metadata for all stored titles, keyed by title ID."""
+    results = {}
     save_dir = settings.save_dir
     if not save_dir.exists():
         return results
 
-    for entry in sorted(save_dir.iterdir()):
-        meta_path = entry / "metadata.json"
-        if entry.is_dir() and meta_path.exists():
-            meta = json.loads(meta_path.read_text(encoding="utf-8"))
-            results.append(meta)
+    for name in sorted(os.listdir(save_dir)):
+        meta = _load_metadata(name)
+        if meta is not None:
+            results[meta.title_id] = meta
 
     return results
 
 
 def get_metadata(title_id: str) -> SaveMetadata | None:
     """Load metadata for a title, or None if it doesn't exist."""
-    path = _metadata_path(title_id)
-    if not path.exists():
-        return None
-
-    data = json.loads(path.read_text(encoding="utf-8"))
-    return SaveMetadata(**data)
+    return _load_metadata(title_id)
 
 
 def store_save(bundle: SaveBundle, source: str = "3ds", console_id: str = "") -> SaveMetadata:
     """Store a save bundle to disk, archiving any existing save to history."""
+    with _store_lock:
+        return _store_save(bundle, source, console_id)
+
+
+def recover_interrupted_stores() -> None:
+    """Finish or undo any store_save that was interrupted mid-swap.
+
+    Run at startup, before any request can read a half-swapped title.
+    """
+    save_dir = settings.save_dir
+    if not save_dir.exists():
+        return
+    with _store_lock:
+        for name in os.listdir(save_dir):
+            if (save_dir / name).is_dir():
+                _recover_title(name)
+
+
+def _recover_title(title_id: str) -> None:
+    """Clean up after an interrupted store_save of a title.
+
+    Everything a store writes (current.new/ and the bundle.bin/metadata.json
+    temp files) is complete before the first rename, so the swap can always
+    be either finished or undone:
+      - current.old/ without current/: died between the two directory
+        renames; the previous save is moved back to current/.
+      - current.old/ with current/: the new files are in place; any temp
+        files left are renamed in so metadata matches current/ again.
+    """
+    current = _current_dir(title_id)
+    staging = current.with_name("current.new")
+    old = current.with_name("current.old")
+    final_paths = [_bundle_path(title_id), _metadata_path(title_id)]
+
+    if old.exists():
+        if current.exists():
+            for path in final_paths:
+                if _tmp_path(path).exists():
+                    os.replace(_tmp_path(path), path)
+            shutil.rmtree(old)
+        else:
+            os.rename(old, current)
+
+    # Anything else left over belongs to a store that never swapped in
+    if staging.exists():
+        shutil.rmtree(staging)
+    for path in final_paths:
+        _tmp_path(path).unlink(missing_ok=True)
+
+
+def _store_save(bundle: SaveBundle, source: str, console_id: str) -> SaveMetadata:
     title_id = bundle.title_id_hex
     current = _current_dir(title_id)
     history = _history_dir(title_id)
 
+    # Don't archive (or overwrite) a save left half-swapped by a crash
+    _recover_title(title_id)
+
     # Archive existing save to history
     if current.exists():
         old_meta = get_metadata(title_id)
@@ -81,26 +187,31 @@ def store_save(bundle: SaveBundle, source: str = "3ds", console_id: str = "") ->
             archive_dir.mkdir(parents=True, exist_ok=True)
             for item in current.iterdir():
                 if item.is_file():
-                    shutil.copy2(item, archive_dir / item.name)
+                    _archive_file(item, archive_dir / item.name)
 
             # Prune old history
             _prune_history(title_id)
 
-        # Clear current directory
-        shutil.rmtree(current)
+    # Write new save files into a staging directory, creating each
+    # directory once up front, then swap it in for current/ with renames
+    # so readers never see a half-written save
+    staging = current.with_name("current.new")
+    old = current.with_name("current.old")
+    file_paths = [staging / f.path for f in bundle.files]
+    staging.mkdir(parents=True)
+    for parent in {file_path.parent for file_path in file_paths}:
+        parent.mkdir(parents=True, exist_ok=True)
+    for f, file_path in zip(bundle.files, file_paths):
+        _write_file(file_path, f.data)
+
+    # Keep the serialized bundle so downloads can send it without rebuilding,
+    # computing the bundle hash in the same pass over the file data.
+    # This must stay SHA-256: the clients compute the same hash over their
+    # local files (bundle_compute_save_hash) and /sync compares the two.
+    hasher = hashlib.sha256()
+    bundle_data = create_bundle(bundle, data_hasher=hasher)
+    bundle_hash = hasher.digest()
 
-    # Write new save files
-    current.mkdir(parents=True, exist_ok=True)
-    for f in bundle.files:
-        file_path = current / f.path
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_path.write_bytes(f.data)
-
-    # Compute bundle hash
-    all_data = b"".join(f.data for f in bundle.files)
-    bundle_hash = hashlib.sha256(all_data).hexdigest()
-
-    # Write metadata
     now = datetime.now(timezone.utc).isoformat()
     meta = SaveMetadata(
         title_id=title_id,
@@ -113,35 +224,113 @@ def store_save(bundle: SaveBundle, source: str = "3ds", console_id: str = "") ->
         client_timestamp=bundle.timestamp,
         server_timestamp=now,
         console_id=console_id,
+        files=[
+            {"path": f.path, "size": f.size, "sha256": f.sha256.hex()}
+            for f in bundle.files
+        ],
     )
 
+    # Write bundle.bin and metadata.json to temp files first and rename both
+    # into place alongside current/, so readers never pick up a half-written
+    # bundle or a bundle that doesn't match its metadata
+    bundle_path = _bundle_path(title_id)
     meta_path = _metadata_path(title_id)
-    meta_path.write_text(json.dumps(meta.to_dict(), indent=2), encoding="utf-8")
+    bundle_tmp = _tmp_path(bundle_path)
+    meta_tmp = _tmp_path(meta_path)
+    _write_file(bundle_tmp, bundle_data)
+    _write_file(meta_tmp, orjson.dumps(meta.to_dict(), option=orjson.OPT_INDENT_2))
+
+    if current.exists():
+        os.rename(current, old)
+    os.rename(staging, current)
+    os.replace(bundle_tmp, bundle_path)
+    os.replace(meta_tmp, meta_path)
+    _metadata_cache()[title_id] = (os.stat(meta_path).st_mtime_ns, meta)
+    if old.exists():
+        shutil.rmtree(old)
 
     return meta
 
 
-def load_save_files(title_id: str) -> list[tuple[str, bytes]] | None:
-    """Load all save files for a title. Returns list of (path, data) or None."""
+def _write_file(path: Path, data: bytes) -> None:
+    """Write data to path with raw fd writes, skipping buffered file objects."""
+    fd = os.open(path, _WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _archive_file(src: Path, dst: Path) -> None:
+    """Snapshot a current save file into history.
+
+    Hard links the file when possible: current/ is replaced by a freshly
+    written directory right after archiving, so the history copy never
+    shares an inode with anything that gets modified later.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Different filesystem, no link support, or dst already exists;
+        # copy2 uses the kernel's in-place copy where available
+        shutil.copy2(src, dst)
+
+
+def get_bundle_path(title_id: str) -> Path | None:
+    """Return the stored wire-format bundle for a title, or None if absent."""
+    path = _bundle_path(title_id)
+    return path if path.exists() else None
+
+
+def _walk_files(root: str, prefix: str = ""):
+    """Yield (relative posix path, absolute path) for every file under root.
+
+    Uses os.scandir so file type checks come from the directory listing
+    instead of a stat call per Path object.
+    """
+    with os.scandir(root) as it:
+        for entry in it:
+            rel_path = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk_files(entry.path, rel_path + "/")
+            elif entry.is_file():
+                yield rel_path, entry.path
+
+
+def list_save_files(title_id: str) -> list[tuple[str, Path]] | None:
+    """List all save files for a title. Returns list of (path, file path) or None."""
     current = _current_dir(title_id)
     if not current.exists():
         return None
 
-    files = []
-    for file_path in sorted(current.rglob("*")):
-        if file_path.is_file():
-            rel_path = file_path.relative_to(current).as_posix()
-            files.append((rel_path, file_path.read_bytes()))
-    return files
+    # Sort by path components, matching the order Path objects sort in
+    files = sorted(_walk_files(str(current)), key=lambda f: f[0].split("/"))
+    return [(rel_path, Path(file_path)) for rel_path, file_path in files]
+
+
+def load_save_files(title_id: str) -> list[tuple[str, bytes]] | None:
+    """Load all save files for a title. Returns list of (path, data) or None."""
+    files = list_save_files(title_id)
+    if files is None:
+        return None
+    result = []
+    for rel_path, file_path in files:
+        with open(file_path, "rb") as fh:
+            result.append((rel_path, fh.read()))
+    return result
 
 
 def _prune_history(title_id: str) -> None:
     """Keep only the most recent N history versions."""
     history = _history_dir(title_id)
-    if not history.exists():
+    try:
+        versions = sorted(os.listdir(history))
+    except FileNotFoundError:
         return
 
-    versions = sorted(history.iterdir(), key=lambda p: p.name)
-    while len(versions) > settings.max_history_versions:
-        oldest = versions.pop(0)
-        shutil.rmtree(oldest)
+    # Version names are timestamps, so the oldest sort first
+    excess = len(versions) - settings.max_history_versions
+    for name in versions[: max(excess, 0)]:
+        shutil.rmtree(history / name)
@@ -0,0 +1,72 @@
+"""Bundle builders and the upload helper shared by the test modules.
+
+Most tests build the same few bundles, so the encoded bytes and save
+hashes are memoized on their (immutable) inputs.
+"""
+
+import functools
+import hashlib
+
+from app.models.save import BundleFile, SaveBundle
+from app.services.bundle import create_bundle
+
+DEFAULT_TITLE_ID = 0x0004000000055D00
+DEFAULT_TIMESTAMP = 1700000000
+DEFAULT_FILES = (("main", b"save data here"),)
+
+# The save every seeded_client test starts with, for DEFAULT_TITLE_ID
+SEED_TIMESTAMP = 1000
+SEED_SAVE = b"same save data"
+
+
+def _make_bundle(
+    title_id: int = DEFAULT_TITLE_ID,
+    timestamp: int = DEFAULT_TIMESTAMP,
+    files: list[tuple[str, bytes]] | None = None,
+) -> SaveBundle:
+    """Build a fresh SaveBundle. Not cached: callers may mutate the result."""
+    if files is None:
+        files = DEFAULT_FILES
+    bundle_files = [
+        BundleFile(
+            path=path,
+            size=len(data),
+            sha256=hashlib.sha256(data).digest(),
+            data=data,
+        )
+        for path, data in files
+    ]
+    return SaveBundle(title_id=title_id, timestamp=timestamp, files=bundle_files)
+
+
+@functools.lru_cache(maxsize=512)
+def _cached_bundle_bytes(
+    title_id: int, timestamp: int, files: tuple[tuple[str, bytes], ...]
+) -> bytes:
+    return create_bundle(_make_bundle(title_id, timestamp, list(files)))
+
+
+def _make_bundle_bytes(
+    title_id: int = DEFAULT_TITLE_ID,
+    timestamp: int = DEFAULT_TIMESTAMP,
+    files: list[tuple[str, bytes]] | None = None,
+) -> bytes:
+    """Encode a v2 bundle, reusing the bytes for repeated identical inputs."""
+    frozen = DEFAULT_FILES if files is None else tuple(map(tuple, files))
+    return _cached_bundle_bytes(title_id, timestamp, frozen)
+
+
+@functools.lru_cache(maxsize=512)
+def _save_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _upload(client, auth_headers, title_id_hex: str, bundle_bytes: bytes):
+    """Helper to upload a save bundle."""
+    r = client.post(
+        f"/api/v1/saves/{title_id_hex}",
+        content=bundle_bytes,
+        headers={**auth_headers, "Content-Type": "application/octet-stream"},
+    )
+    assert r.status_code == 200
+    return r
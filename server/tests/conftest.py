@@ -1,11 +1,17 @@
+import asyncio
 import shutil
-import tempfile
-from pathlib import Path
 
+import httpx
 import pytest
-from fastapi.testclient import TestClient
 
 from app.config import settings
+from ._bundle_helpers import (
+    DEFAULT_TITLE_ID,
+    SEED_SAVE,
+    SEED_TIMESTAMP,
+    _make_bundle_bytes,
+    _upload,
+)
 
 
 @pytest.fixture(autouse=True)
@@ -18,13 +24,99 @@ def tmp_save_dir(tmp_path):
     settings.save_dir = original
 
 
+class _ASGIClient:
+    """Synchronous facade over httpx.AsyncClient + ASGITransport.
+
+    Requests are dispatched to the app in-process on one event loop owned
+    by the client, without TestClient's per-request portal thread.
+    httpx.ASGITransport only implements the async transport interface, so
+    a plain httpx.Client can't drive it directly.
+    """
+
+    def __init__(self, app) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://testserver"
+        )
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return self._loop.run_until_complete(self._client.request(method, url, **kwargs))
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def gather(self, *calls: tuple[str, str, dict]) -> list[httpx.Response]:
+        """Send independent (method, url, kwargs) requests concurrently."""
+
+        async def send_all() -> list[httpx.Response]:
+            return await asyncio.gather(*(
+                self._client.request(method, url, **kwargs) for method, url, kwargs in calls
+            ))
+
+        return self._loop.run_until_complete(send_all())
+
+    def close(self) -> None:
+        self._loop.run_until_complete(self._client.aclose())
+        self._loop.close()
+
+
 @pytest.fixture()
 def client():
     # Import here so settings are patched first
     from app.main import create_app
 
-    app = create_app()
-    return TestClient(app)
+    c = _ASGIClient(create_app())
+    yield c
+    c.close()
+
+
+@pytest.fixture(scope="module")
+def shared_client():
+    """One client reused by a module's tests that never write saves.
+
+    The app reads settings.save_dir per request, so each test still sees
+    its own empty tmp_save_dir.
+    """
+    from app.main import create_app
+
+    c = _ASGIClient(create_app())
+    yield c
+    c.close()
+
+
+@pytest.fixture(scope="session")
+def seeded_save_dir(tmp_path_factory):
+    """A save directory holding one uploaded save, built once per session."""
+    from app.main import create_app
+
+    seed_dir = tmp_path_factory.mktemp("seed") / "saves"
+    seed_dir.mkdir()
+    original = settings.save_dir
+    settings.save_dir = seed_dir
+    c = _ASGIClient(create_app())
+    try:
+        bundle = _make_bundle_bytes(
+            timestamp=SEED_TIMESTAMP, files=[("main", SEED_SAVE)]
+        )
+        _upload(c, {"X-API-Key": settings.api_key}, f"{DEFAULT_TITLE_ID:016X}", bundle)
+    finally:
+        c.close()
+        settings.save_dir = original
+    return seed_dir
+
+
+@pytest.fixture()
+def seeded_client(client, tmp_save_dir, seeded_save_dir):
+    """A client whose server already has SEED_SAVE stored.
+
+    Copies the session's seeded directory instead of re-uploading, so each
+    test still gets its own writable copy.
+    """
+    shutil.copytree(seeded_save_dir, tmp_save_dir, dirs_exist_ok=True)
+    return client
 
 
 @pytest.fixture()
@@ -35,3 +127,30 @@ def api_key():
 @pytest.fixture()
 def auth_headers(api_key):
     return {"X-API-Key": api_key}
+
+
+# Bundle bytes are immutable, so each distinct bundle is built once per session
+
+
+@pytest.fixture(scope="session")
+def default_bundle_bytes():
+    return _make_bundle_bytes()
+
+
+@pytest.fixture(scope="session")
+def newer_bundle_bytes():
+    return _make_bundle_bytes(timestamp=2000, files=[("main", b"newer")])
+
+
+@pytest.fixture(scope="session")
+def older_bundle_bytes():
+    return _make_bundle_bytes(timestamp=1000, files=[("main", b"older")])
+
+
+@pytest.fixture(scope="session")
+def history_bundle_pair():
+    """Two successive versions of one save: v1 at timestamp 1000, v2 at 2000."""
+    return (
+        _make_bundle_bytes(timestamp=1000, files=[("main", b"v1")]),
+        _make_bundle_bytes(timestamp=2000, files=[("main", b"v2")]),
+    )
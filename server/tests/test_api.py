@@ -1,27 +1,4 @@
-import hashlib
-
-from app.models.save import BundleFile, SaveBundle
-from app.services.bundle import create_bundle
-
-
-def _make_bundle_bytes(
-    title_id: int = 0x0004000000055D00,
-    timestamp: int = 1700000000,
-    files: list[tuple[str, bytes]] | None = None,
-) -> bytes:
-    if files is None:
-        files = [("main", b"save data here")]
-    bundle_files = [
-        BundleFile(
-            path=path,
-            size=len(data),
-            sha256=hashlib.sha256(data).digest(),
-            data=data,
-        )
-        for path, data in files
-    ]
-    bundle = SaveBundle(title_id=title_id, timestamp=timestamp, files=bundle_files)
-    return create_bundle(bundle)
+from ._bundle_helpers import _make_bundle_bytes, _save_hash
 
 
 class TestStatusEndpoint:
@@ -54,11 +31,10 @@ class TestTitlesEndpoint:
         assert r.status_code == 200
         assert r.json() == {"titles": []}
 
-    def test_list_after_upload(self, client, auth_headers):
-        bundle = _make_bundle_bytes()
+    def test_list_after_upload(self, client, auth_headers, default_bundle_bytes):
         client.post(
             "/api/v1/saves/0004000000055D00",
-            content=bundle,
+            content=default_bundle_bytes,
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
 
@@ -70,11 +46,10 @@ class TestTitlesEndpoint:
 
 
 class TestUploadEndpoint:
-    def test_upload_success(self, client, auth_headers):
-        bundle = _make_bundle_bytes()
+    def test_upload_success(self, client, auth_headers, default_bundle_bytes):
         r = client.post(
             "/api/v1/saves/0004000000055D00",
-            content=bundle,
+            content=default_bundle_bytes,
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
         assert r.status_code == 200
@@ -82,70 +57,78 @@ class TestUploadEndpoint:
         assert data["status"] == "ok"
         assert "sha256" in data
 
-    def test_upload_empty_body(self, client, auth_headers):
-        r = client.post(
+    def test_upload_empty_body(self, shared_client, auth_headers):
+        r = shared_client.post(
             "/api/v1/saves/0004000000055D00",
             content=b"",
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
         assert r.status_code == 400
 
-    def test_upload_invalid_bundle(self, client, auth_headers):
-        r = client.post(
+    def test_upload_invalid_bundle(self, shared_client, auth_headers):
+        r = shared_client.post(
             "/api/v1/saves/0004000000055D00",
             content=b"garbage data here",
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
         assert r.status_code == 400
 
-    def test_upload_title_id_mismatch(self, client, auth_headers):
-        bundle = _make_bundle_bytes(title_id=0x0004000000055D00)
-        r = client.post(
+    def test_upload_title_id_mismatch(self, shared_client, auth_headers, default_bundle_bytes):
+        # The default bundle is for title 0004000000055D00
+        r = shared_client.post(
             "/api/v1/saves/00040000001B5000",
-            content=bundle,
+            content=default_bundle_bytes,
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
         assert r.status_code == 400
         assert "mismatch" in r.json()["detail"].lower()
 
-    def test_upload_invalid_title_id_format(self, client, auth_headers):
-        r = client.post(
+    def test_upload_invalid_title_id_format(self, shared_client, auth_headers):
+        r = shared_client.post(
             "/api/v1/saves/not-a-hex-id",
             content=b"whatever",
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
         assert r.status_code == 400
 
-    def test_upload_conflict_older_timestamp(self, client, auth_headers):
+    def test_upload_title_id_with_whitespace(self, shared_client, auth_headers):
+        r = shared_client.post(
+            "/api/v1/saves/00040000%20055D00%20",
+            content=b"whatever",
+            headers={**auth_headers, "Content-Type": "application/octet-stream"},
+        )
+        assert r.status_code == 400
+
+    def test_upload_conflict_older_timestamp(
+        self, client, auth_headers, newer_bundle_bytes, older_bundle_bytes
+    ):
         # Upload a save with timestamp 2000
-        bundle1 = _make_bundle_bytes(timestamp=2000, files=[("main", b"newer")])
         client.post(
             "/api/v1/saves/0004000000055D00",
-            content=bundle1,
+            content=newer_bundle_bytes,
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
 
         # Try uploading with older timestamp 1000
-        bundle2 = _make_bundle_bytes(timestamp=1000, files=[("main", b"older")])
         r = client.post(
             "/api/v1/saves/0004000000055D00",
-            content=bundle2,
+            content=older_bundle_bytes,
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
         assert r.status_code == 409
 
-    def test_upload_force_override(self, client, auth_headers):
-        bundle1 = _make_bundle_bytes(timestamp=2000, files=[("main", b"newer")])
+    def test_upload_force_override(
+        self, client, auth_headers, newer_bundle_bytes, older_bundle_bytes
+    ):
         client.post(
             "/api/v1/saves/0004000000055D00",
-            content=bundle1,
+            content=newer_bundle_bytes,
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
 
-        bundle2 = _make_bundle_bytes(timestamp=1000, files=[("main", b"older")])
         r = client.post(
             "/api/v1/saves/0004000000055D00?force=true",
-            content=bundle2,
+            content=older_bundle_bytes,
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
         assert r.status_code == 200
@@ -174,16 +157,57 @@ class TestDownloadEndpoint:
         assert r.headers["content-type"] == "application/octet-stream"
         assert "X-Save-Timestamp" in r.headers
 
-        # Parse the returned bundle and verify contents
+        # The stored bundle is served verbatim, so it matches the upload byte
+        # for byte; parsing is covered in test_bundle.py
+        assert r.content == bundle
+
+    def test_download_without_stored_bundle(self, client, auth_headers, tmp_save_dir):
+        """Saves stored before bundle.bin existed are rebuilt from the files."""
+        save_data = b"pokemon save file data"
+        bundle = _make_bundle_bytes(files=[("main", save_data)])
+        client.post(
+            "/api/v1/saves/0004000000055D00",
+            content=bundle,
+            headers={**auth_headers, "Content-Type": "application/octet-stream"},
+        )
+        (tmp_save_dir / "0004000000055D00" / "bundle.bin").unlink()
+
+        r = client.get(
+            "/api/v1/saves/0004000000055D00", headers=auth_headers
+        )
+        assert r.status_code == 200
+
         from app.services.bundle import parse_bundle
 
         downloaded = parse_bundle(r.content)
-        assert len(downloaded.files) == 1
         assert downloaded.files[0].data == save_data
 
-    def test_upload_preserves_history(self, client, auth_headers, tmp_save_dir):
+    def test_download_rebuilt_nested_files(self, client, auth_headers, tmp_save_dir):
+        """Rebuilt bundles include files in subdirectories, in path order."""
+        files = [("data/a/slot1", b"one"), ("data/a-b", b"two"), ("main", b"three")]
+        client.post(
+            "/api/v1/saves/0004000000055D00",
+            content=_make_bundle_bytes(files=files),
+            headers={**auth_headers, "Content-Type": "application/octet-stream"},
+        )
+        (tmp_save_dir / "0004000000055D00" / "bundle.bin").unlink()
+
+        r = client.get(
+            "/api/v1/saves/0004000000055D00", headers=auth_headers
+        )
+        assert r.status_code == 200
+
+        from app.services.bundle import parse_bundle
+
+        downloaded = parse_bundle(r.content)
+        assert [(f.path, f.data) for f in downloaded.files] == files
+
+    def test_upload_preserves_history(
+        self, client, auth_headers, tmp_save_dir, history_bundle_pair
+    ):
+        bundle1, bundle2 = history_bundle_pair
+
         # Upload v1
-        bundle1 = _make_bundle_bytes(timestamp=1000, files=[("main", b"v1")])
         client.post(
             "/api/v1/saves/0004000000055D00",
             content=bundle1,
@@ -191,7 +215,6 @@ class TestDownloadEndpoint:
         )
 
         # Upload v2 (newer)
-        bundle2 = _make_bundle_bytes(timestamp=2000, files=[("main", b"v2")])
         client.post(
             "/api/v1/saves/0004000000055D00",
             content=bundle2,
@@ -203,6 +226,70 @@ class TestDownloadEndpoint:
         assert history_dir.exists()
         versions = list(history_dir.iterdir())
         assert len(versions) == 1
+        # The archived copy keeps the old data after current/ is rewritten
+        assert (versions[0] / "main").read_bytes() == b"v1"
+        current = tmp_save_dir / "0004000000055D00" / "current" / "main"
+        assert current.read_bytes() == b"v2"
+
+    def test_upload_replaces_current(self, client, auth_headers, tmp_save_dir):
+        """A new upload fully replaces current/, even after an interrupted store."""
+        title_dir = tmp_save_dir / "0004000000055D00"
+        client.post(
+            "/api/v1/saves/0004000000055D00",
+            content=_make_bundle_bytes(timestamp=1000, files=[("main", b"v1"), ("extra", b"x")]),
+            headers={**auth_headers, "Content-Type": "application/octet-stream"},
+        )
+        # Simulate a staging directory left behind by a crash
+        (title_dir / "current.new").mkdir()
+        (title_dir / "current.new" / "stale").write_bytes(b"stale")
+
+        client.post(
+            "/api/v1/saves/0004000000055D00",
+            content=_make_bundle_bytes(timestamp=2000, files=[("main", b"v2")]),
+            headers={**auth_headers, "Content-Type": "application/octet-stream"},
+        )
+
+        assert sorted(p.name for p in (title_dir / "current").iterdir()) == ["main"]
+        assert (title_dir / "current" / "main").read_bytes() == b"v2"
+        assert not (title_dir / "current.new").exists()
+        assert not (title_dir / "current.old").exists()
+
+    def test_interrupted_swap_restores_previous_save(self, client, auth_headers, tmp_save_dir):
+        """A crash between the current/ renames leaves the old save in current.old/."""
+        from app.services import storage
+
+        title_dir = tmp_save_dir / "0004000000055D00"
+        client.post(
+            "/api/v1/saves/0004000000055D00",
+            content=_make_bundle_bytes(timestamp=1000, files=[("main", b"v1")]),
+            headers={**auth_headers, "Content-Type": "application/octet-stream"},
+        )
+        (title_dir / "current").rename(title_dir / "current.old")
+        (title_dir / "current.new").mkdir()
+        (title_dir / "metadata.json.tmp").write_bytes(b"{}")
+
+        storage.recover_interrupted_stores()
+
+        assert (title_dir / "current" / "main").read_bytes() == b"v1"
+        assert not (title_dir / "current.old").exists()
+        assert not (title_dir / "current.new").exists()
+        assert not (title_dir / "metadata.json.tmp").exists()
+
+    def test_history_pruned(self, client, auth_headers, tmp_save_dir, monkeypatch):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "max_history_versions", 2)
+        for ts in range(1, 6):
+            client.post(
+                "/api/v1/saves/0004000000055D00",
+                content=_make_bundle_bytes(timestamp=ts, files=[("main", b"v%d" % ts)]),
+                headers={**auth_headers, "Content-Type": "application/octet-stream"},
+            )
+
+        # Only the two most recent archived versions (v3, v4) are kept
+        history_dir = tmp_save_dir / "0004000000055D00" / "history"
+        versions = sorted(history_dir.iterdir())
+        assert [(v / "main").read_bytes() for v in versions] == [b"v3", b"v4"]
 
 
 class TestMetadataEndpoint:
@@ -212,11 +299,11 @@ class TestMetadataEndpoint:
         )
         assert r.status_code == 404
 
-    def test_meta_after_upload(self, client, auth_headers):
-        bundle = _make_bundle_bytes(timestamp=1700000000)
+    def test_meta_after_upload(self, client, auth_headers, default_bundle_bytes):
+        # The default bundle has timestamp 1700000000
         client.post(
             "/api/v1/saves/0004000000055D00",
-            content=bundle,
+            content=default_bundle_bytes,
             headers={**auth_headers, "Content-Type": "application/octet-stream"},
         )
 
@@ -229,3 +316,37 @@ class TestMetadataEndpoint:
         assert data["client_timestamp"] == 1700000000
         assert data["file_count"] == 1
         assert "save_hash" in data
+        assert data["files"] == [
+            {
+                "path": "main",
+                "size": len(b"save data here"),
+                "sha256": _save_hash(b"save data here"),
+            }
+        ]
+
+    def test_meta_reloaded_after_external_edit(
+        self, client, auth_headers, tmp_save_dir, default_bundle_bytes
+    ):
+        """Cached metadata is re-read once metadata.json changes on disk."""
+        client.post(
+            "/api/v1/saves/0004000000055D00",
+            content=default_bundle_bytes,
+            headers={**auth_headers, "Content-Type": "application/octet-stream"},
+        )
+        r = client.get("/api/v1/saves/0004000000055D00/meta", headers=auth_headers)
+        assert r.json()["name"] == "0004000000055D00"
+
+        import json
+        import os
+
+        meta_path = tmp_save_dir / "0004000000055D00" / "metadata.json"
+        data = json.loads(meta_path.read_text())
+        data["name"] = "Edited"
+        meta_path.write_text(json.dumps(data))
+        mtime = meta_path.stat().st_mtime_ns + 1_000_000_000
+        os.utime(meta_path, ns=(mtime, mtime))
+
+        r = client.get("/api/v1/saves/0004000000055D00/meta", headers=auth_headers)
+        assert r.json()["name"] == "Edited"
+        r = client.get("/api/v1/titles", headers=auth_headers)
+        assert r.json()["titles"][0]["name"] == "Edited"
@@ -1,33 +1,50 @@
-import hashlib
-
-from app.models.save import BundleFile, SaveBundle
-from app.services.bundle import BundleError, create_bundle, parse_bundle
+import asyncio
+import functools
+import struct
+
+from app.models.save import SaveBundle
+from app.services.bundle import (
+    BundleError,
+    create_bundle,
+    parse_bundle,
+    parse_bundle_stream,
+    stream_bundle,
+)
 import pytest
 
+from ._bundle_helpers import _make_bundle
 
-def _make_bundle(
-    title_id: int = 0x0004000000055D00,
-    timestamp: int = 1700000000,
-    files: list[tuple[str, bytes]] | None = None,
-) -> SaveBundle:
-    if files is None:
-        files = [("main", b"save data here")]
-    bundle_files = [
-        BundleFile(
-            path=path,
-            size=len(data),
-            sha256=hashlib.sha256(data).digest(),
-            data=data,
-        )
-        for path, data in files
-    ]
-    return SaveBundle(title_id=title_id, timestamp=timestamp, files=bundle_files)
+_BIG_DATA = b"\xff" * 1024 * 512  # 512KB
+
+
+@functools.cache
+def _big_bundle_bytes() -> bytes:
+    return create_bundle(_make_bundle(files=[("main", _BIG_DATA)]))
+
+
+@pytest.fixture(scope="module")
+def default_bundle_uncompressed() -> tuple[SaveBundle, bytes]:
+    original = _make_bundle()
+    return original, create_bundle(original, compress=False)
+
+
+@pytest.fixture(scope="module")
+def default_bundle_compressed() -> tuple[SaveBundle, bytes]:
+    original = _make_bundle()
+    return original, create_bundle(original, compress=True)
+
+
+def _parse_chunked(data: bytes, chunk_size: int) -> SaveBundle:
+    async def chunks():
+        for i in range(0, len(data), chunk_size):
+            yield data[i : i + chunk_size]
+
+    return asyncio.run(parse_bundle_stream(chunks()))
 
 
 class TestBundleRoundTrip:
-    def test_single_file(self):
-        original = _make_bundle()
-        data = create_bundle(original)
+    def test_single_file(self, default_bundle_compressed):
+        original, data = default_bundle_compressed
         parsed = parse_bundle(data)
 
         assert parsed.title_id == original.title_id
@@ -55,6 +72,17 @@ class TestBundleRoundTrip:
         assert parsed.files[2].path == "extra/data.bin"
         assert parsed.files[2].data == b"\x00\x01\x02\x03"
 
+    def test_uncompressed_files_are_views(self, default_bundle_uncompressed):
+        """v1 file data references the input buffer instead of copying it."""
+        _, data = default_bundle_uncompressed
+        parsed = parse_bundle(data)
+
+        f = parsed.files[0]
+        assert isinstance(f.data, memoryview)
+        assert f.data.obj is data
+        assert f.materialize() == b"save data here"
+        assert type(f.data) is bytes
+
     def test_empty_files(self):
         original = _make_bundle(files=[])
         data = create_bundle(original)
@@ -63,12 +91,15 @@ class TestBundleRoundTrip:
         assert len(parsed.files) == 0
 
     def test_large_file(self):
-        big_data = b"\xff" * 1024 * 512  # 512KB
-        original = _make_bundle(files=[("main", big_data)])
-        data = create_bundle(original)
-        parsed = parse_bundle(data)
+        parsed = parse_bundle(_big_bundle_bytes())
+
+        assert parsed.files[0].data == _BIG_DATA
+
+    def test_large_multiple_files(self):
+        files = [(f"file{i}", bytes([i]) * 1024 * 400) for i in range(4)]
+        parsed = parse_bundle(create_bundle(_make_bundle(files=files)))
 
-        assert parsed.files[0].data == big_data
+        assert [(f.path, f.data) for f in parsed.files] == files
 
     def test_title_id_preserved(self):
         original = _make_bundle(title_id=0x00040000001B5000)
@@ -79,6 +110,109 @@ class TestBundleRoundTrip:
         assert parsed.title_id_hex == "00040000001B5000"
 
 
+class TestZlibCodec:
+    def test_stdlib_and_libdeflate_interoperate(self, monkeypatch):
+        deflate = pytest.importorskip("deflate")
+        from app.services import bundle as bundle_module
+
+        original = _make_bundle(files=[("main", b"main save" * 1000)])
+        fast = create_bundle(original)
+        monkeypatch.setattr(bundle_module, "deflate", None)
+        slow = create_bundle(original)
+
+        assert parse_bundle(fast) == parse_bundle(slow) == original
+        monkeypatch.setattr(bundle_module, "deflate", deflate)
+        assert parse_bundle(slow) == original
+
+
+class TestStreamBundle:
+    @pytest.mark.parametrize("compress", [True, False])
+    def test_matches_create_bundle(self, tmp_path, compress):
+        contents = [("main", b"main save"), ("extra/data.bin", b"\x00\x01" * 50000)]
+        files = []
+        for path, data in contents:
+            file_path = tmp_path / path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_bytes(data)
+            files.append((path, file_path))
+
+        streamed = b"".join(stream_bundle(0x0004000000055D00, 1700000000, files, compress))
+        parsed = parse_bundle(streamed)
+
+        assert parsed.title_id == 0x0004000000055D00
+        assert parsed.timestamp == 1700000000
+        assert [(f.path, f.data) for f in parsed.files] == contents
+        assert streamed[:28] == create_bundle(_make_bundle(files=contents), compress)[:28]
+
+    def test_known_hashes_skip_rehash(self, tmp_path):
+        file_path = tmp_path / "main"
+        file_path.write_bytes(b"save data here")
+        stale = b"\x00" * 32
+
+        streamed = b"".join(stream_bundle(
+            0x0004000000055D00, 1700000000, [("main", file_path)],
+            known_hashes={"main": (14, stale)},
+        ))
+
+        # The recorded hash is trusted as-is, so a stale one shows up on parse
+        with pytest.raises(BundleError, match="Hash mismatch"):
+            parse_bundle(streamed)
+
+
+    def test_snapshot_survives_swap(self, tmp_path):
+        """Files replaced after streaming starts don't leak into the bundle."""
+        file_path = tmp_path / "main"
+        file_path.write_bytes(b"old save")
+
+        chunks = stream_bundle(0x0004000000055D00, 1700000000, [("main", file_path)], False)
+        header = next(chunks)
+        # Swap in a new file the way store_save does, by rename
+        replacement = tmp_path / "main.new"
+        replacement.write_bytes(b"new save, longer")
+        replacement.replace(file_path)
+
+        parsed = parse_bundle(header + b"".join(chunks))
+        assert parsed.files[0].data == b"old save"
+
+
+class TestParseBundleStream:
+    @pytest.mark.parametrize("compress", [True, False])
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+    def test_matches_parse_bundle(self, compress, chunk_size):
+        original = _make_bundle(
+            files=[
+                ("main", b"main save" * 100),
+                ("empty", b""),
+                ("extra/data.bin", b"\x00\x01\x02\x03"),
+            ]
+        )
+        data = create_bundle(original, compress=compress)
+        parsed = _parse_chunked(data, chunk_size)
+
+        assert parsed == parse_bundle(data)
+
+    def test_too_small(self):
+        with pytest.raises(BundleError, match="too small"):
+            _parse_chunked(b"", 16)
+
+    def test_truncated(self, default_bundle_uncompressed):
+        _, data = default_bundle_uncompressed
+        with pytest.raises(BundleError, match="Truncated file data"):
+            _parse_chunked(data[:-1], 16)
+
+    def test_corrupted_hash(self, default_bundle_uncompressed):
+        data = bytearray(default_bundle_uncompressed[1])
+        data[-1] ^= 0xFF
+        with pytest.raises(BundleError, match="Hash mismatch"):
+            _parse_chunked(bytes(data), 16)
+
+    def test_corrupted_compressed_data(self, default_bundle_compressed):
+        data = bytearray(default_bundle_compressed[1])
+        data[-1] ^= 0xFF
+        with pytest.raises(BundleError, match="Decompression failed"):
+            _parse_chunked(bytes(data), 16)
+
+
 class TestBundleErrors:
     def test_too_small(self):
         with pytest.raises(BundleError, match="too small"):
@@ -89,26 +223,33 @@ class TestBundleErrors:
             parse_bundle(b"XXXX" + b"\x00" * 24)
 
     def test_bad_version(self):
-        import struct
-
         data = b"3DSS" + struct.pack("<I", 99) + b"\x00" * 20
         with pytest.raises(BundleError, match="Unsupported version"):
             parse_bundle(data)
 
-    def test_corrupted_compressed_data(self):
+    def test_corrupted_compressed_data(self, default_bundle_compressed):
         """Corrupting compressed data should cause decompression failure."""
-        original = _make_bundle()
-        data = bytearray(create_bundle(original, compress=True))
+        data = bytearray(default_bundle_compressed[1])
         # Corrupt the last byte of compressed data
         data[-1] ^= 0xFF
         with pytest.raises(BundleError, match="Decompression failed"):
             parse_bundle(bytes(data))
 
-    def test_corrupted_hash_uncompressed(self):
+    def test_corrupted_hash_uncompressed(self, default_bundle_uncompressed):
         """Corrupting uncompressed file data should cause hash mismatch."""
-        original = _make_bundle()
-        data = bytearray(create_bundle(original, compress=False))
+        data = bytearray(default_bundle_uncompressed[1])
         # Corrupt the last byte of file data
         data[-1] ^= 0xFF
         with pytest.raises(BundleError, match="Hash mismatch"):
             parse_bundle(bytes(data))
+
+    def test_invalid_path_encoding(self):
+        """A file path that isn't valid UTF-8 should be rejected as a bundle error."""
+        original = _make_bundle(files=[("save.bin", b"data")])
+        data = bytearray(create_bundle(original, compress=False))
+        # First path byte sits right after the header and its length field
+        data[struct.calcsize("<4sI8sIII") + 2] = 0xFF
+        with pytest.raises(BundleError, match="Invalid file path encoding"):
+            parse_bundle(bytes(data))
+        with pytest.raises(BundleError, match="Invalid file path encoding"):
+            _parse_chunked(bytes(data), 7)
@@ -0,0 +1,68 @@
+import msgspec
+import pytest
+from fastapi.exceptions import RequestValidationError
+
+from app.models.save import SyncRequest
+from app.request_body import decode_body, openapi_request_body
+
+
+_TITLE = b'"title_id": "0004000000055d00", "save_hash": "ab", "size": 1'
+
+
+def _errors(body: bytes) -> list[dict]:
+    with pytest.raises(RequestValidationError) as exc_info:
+        decode_body(body, SyncRequest)
+    return exc_info.value.errors()
+
+
+class TestDecodeBody:
+    """Error locations are parsed out of msgspec's messages; written against
+    msgspec 0.22. If these fail after a msgspec upgrade, update the
+    patterns in app/request_body.py."""
+
+    def test_decodes_and_normalizes(self):
+        request = decode_body(b'{"titles": [{%s, "timestamp": 5}]}' % _TITLE, SyncRequest)
+        assert request.titles[0].title_id == "0004000000055D00"
+        assert request.titles[0].timestamp == 5
+
+    @pytest.mark.parametrize("timestamp", [b"1000.0", b'"1000"'])
+    def test_lax_ints(self, timestamp):
+        body = b'{"titles": [{%s, "timestamp": %s}]}' % (_TITLE, timestamp)
+        request = decode_body(body, SyncRequest)
+        assert request.titles[0].timestamp == 1000
+
+    def test_wrong_type(self):
+        assert _errors(b'{"titles": [{%s, "timestamp": []}]}' % _TITLE) == [{
+            "type": "value_error",
+            "loc": ("body", "titles", 0, "timestamp"),
+            "msg": "Expected `int`, got `array`",
+            "input": [],
+        }]
+
+    def test_invalid_title_id(self):
+        (error,) = _errors(
+            b'{"titles": [{"title_id": "nothex", "save_hash": "", "timestamp": 1, "size": 1}]}'
+        )
+        assert error["loc"] == ("body", "titles", 0, "title_id")
+        assert error["input"] == "nothex"
+
+    def test_missing_field(self):
+        assert _errors(b'{"titles": [{"title_id": "0004000000055d00"}]}') == [{
+            "type": "missing",
+            "loc": ("body", "titles", 0, "save_hash"),
+            "msg": "Object missing required field `save_hash`",
+            "input": {"title_id": "0004000000055d00"},
+        }]
+
+    def test_invalid_json(self):
+        (error,) = _errors(b'{"titles": [')
+        assert error["type"] == "json_invalid"
+        assert error["loc"] == ("body",)
+
+
+def test_openapi_request_body_inlines_refs():
+    body = openapi_request_body(SyncRequest)
+    schema = body["requestBody"]["content"]["application/json"]["schema"]
+    assert "$ref" not in msgspec.json.encode(schema).decode()
+    assert schema["required"] == ["titles"]
+    assert "title_id" in schema["properties"]["titles"]["items"]["properties"]
@@ -1,149 +1,205 @@
-import hashlib
-
-from app.models.save import BundleFile, SaveBundle
-from app.services.bundle import create_bundle
-
-
-def _make_bundle_bytes(
-    title_id: int = 0x0004000000055D00,
-    timestamp: int = 1700000000,
-    files: list[tuple[str, bytes]] | None = None,
-) -> bytes:
-    if files is None:
-        files = [("main", b"save data here")]
-    bundle_files = [
-        BundleFile(
-            path=path,
-            size=len(data),
-            sha256=hashlib.sha256(data).digest(),
-            data=data,
-        )
-        for path, data in files
-    ]
-    bundle = SaveBundle(title_id=title_id, timestamp=timestamp, files=bundle_files)
-    return create_bundle(bundle)
+import orjson
+import pytest
+
+from app.config import settings
+from app.models.save import ConflictInfo, SyncPlan
+from ._bundle_helpers import SEED_SAVE, _make_bundle_bytes, _save_hash, _upload
+
+
+# Fixed save contents used by the three-way tests, hashed once at import
+_SHARED_SAVE = b"shared version"
+_HASH_SHARED = _save_hash(_SHARED_SAVE)
+_V1_SAVE = b"version 1"
+_HASH_V1 = _save_hash(_V1_SAVE)
+_ORIGINAL_SAVE = b"original"
+_HASH_ORIGINAL = _save_hash(_ORIGINAL_SAVE)
+_CONSOLE_A_SAVE = b"console A save"
+_HASH_CONSOLE_A = _save_hash(_CONSOLE_A_SAVE)
+_GAME_B_OLD_SAVE = b"game B old"
+_HASH_GAME_B_OLD = _save_hash(_GAME_B_OLD_SAVE)
+
 
+def _sync_body(*titles: dict) -> bytes:
+    return orjson.dumps({"titles": list(titles)})
 
-def _save_hash(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
 
+def _check_plan(plan: dict) -> None:
+    """Check a /sync response against the documented SyncPlan schema.
 
-def _upload(client, auth_headers, title_id_hex: str, bundle_bytes: bytes):
-    """Helper to upload a save bundle."""
+    The route returns a hand-built dict, so nothing else keeps the two in step.
+    """
+    SyncPlan.model_validate(plan, strict=True)
+    assert plan.keys() == SyncPlan.model_fields.keys()
+    for info in plan["conflict_info"]:
+        assert info.keys() == ConflictInfo.model_fields.keys()
+
+
+def _post_sync(client, headers: dict, body: bytes):
+    """POST a pre-serialized /sync body, checking the schema of any plan returned."""
     r = client.post(
-        f"/api/v1/saves/{title_id_hex}",
-        content=bundle_bytes,
-        headers={**auth_headers, "Content-Type": "application/octet-stream"},
+        "/api/v1/sync",
+        content=body,
+        headers={**headers, "Content-Type": "application/json"},
     )
-    assert r.status_code == 200
+    if r.status_code == 200:
+        _check_plan(r.json())
     return r
 
 
-class TestSyncEndpoint:
-    def test_empty_sync(self, client, auth_headers):
-        """No titles on either side -> empty plan."""
-        r = client.post(
-            "/api/v1/sync",
-            json={"titles": []},
-            headers=auth_headers,
-        )
-        assert r.status_code == 200
-        plan = r.json()
-        assert plan["upload"] == []
-        assert plan["download"] == []
-        assert plan["conflict"] == []
-        assert plan["up_to_date"] == []
-        assert plan["server_only"] == []
-
-    def test_client_has_new_title(self, client, auth_headers):
-        """Title exists only on 3DS -> should upload."""
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": "abcd1234" * 8,
-                        "timestamp": 1700000000,
-                        "size": 512,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
-        assert r.status_code == 200
-        plan = r.json()
-        assert "0004000000055D00" in plan["upload"]
-        assert plan["download"] == []
+# Request bodies that don't depend on server state, serialized once at import
+_SYNC_EMPTY = _sync_body()
+_SYNC_NEW_TITLE = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": "abcd1234" * 8,
+    "timestamp": 1700000000,
+    "size": 512,
+})
+_SYNC_INVALID_TITLE_ID = _sync_body({
+    "title_id": "not-hex",
+    "save_hash": "abc123",
+    "timestamp": 1000,
+    "size": 100,
+})
+_SYNC_NO_LAST_SYNCED = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": "different_hash__" * 4,
+    "timestamp": 1000,
+    "size": 512,
+})
+_SYNC_CLIENT_CHANGED = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": "client_modified_" * 4,
+    "timestamp": 2000,
+    "size": 512,
+    "last_synced_hash": _HASH_SHARED,
+})
+_SYNC_CLIENT_UNCHANGED_V1 = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": _HASH_V1,
+    "timestamp": 1000,
+    "size": 100,
+    "last_synced_hash": _HASH_V1,
+})
+_SYNC_BOTH_CHANGED = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": "client_also_chgd" * 4,
+    "timestamp": 2000,
+    "size": 500,
+    "last_synced_hash": _HASH_ORIGINAL,
+})
+_SYNC_CONSOLE_B_PLAYED = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": "console_b_played" * 4,
+    "timestamp": 2000,
+    "size": 200,
+    "last_synced_hash": _HASH_CONSOLE_A,
+})
+_SYNC_CONSOLE_A_UNCHANGED = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": _HASH_CONSOLE_A,
+    "timestamp": 1000,
+    "size": 100,
+    "last_synced_hash": _HASH_CONSOLE_A,
+})
+_SYNC_UPPERCASE_HASH = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": _save_hash(SEED_SAVE).upper(),
+    "timestamp": 1000,
+    "size": len(SEED_SAVE),
+})
+_SYNC_SAME_TIMESTAMP = _sync_body({
+    "title_id": "0004000000055D00",
+    "save_hash": "completely_different" * 4,
+    "timestamp": 1000,
+    "size": 512,
+})
+
+_EMPTY_PLAN = {
+    "upload": [],
+    "download": [],
+    "conflict": [],
+    "up_to_date": [],
+    "server_only": [],
+}
+
+
+class TestSyncRequests:
+    """Requests against an empty server, sharing one client."""
+
+    @pytest.mark.parametrize(
+        "body, authed, status, expected",
+        [
+            pytest.param(
+                _SYNC_EMPTY, True, 200, _EMPTY_PLAN,
+                id="empty_sync",
+            ),
+            pytest.param(
+                _SYNC_NEW_TITLE, True, 200, {"upload": ["0004000000055D00"], "download": []},
+                id="client_has_new_title",
+            ),
+            pytest.param(
+                _SYNC_EMPTY, False, 401, None,
+                id="requires_auth",
+            ),
+            pytest.param(
+                _SYNC_INVALID_TITLE_ID, True, 422,
+                {"detail": [{
+                    "type": "value_error",
+                    "loc": ["body", "titles", 0, "title_id"],
+                    "msg": "Expected `str` matching regex '^[0-9A-Fa-f]{16}$'",
+                    "input": "not-hex",
+                }]},
+                id="invalid_title_id_rejected",
+            ),
+        ],
+    )
+    def test_sync_request(self, shared_client, body, authed, status, expected):
+        headers = {"X-API-Key": settings.api_key} if authed else {}
+        r = _post_sync(shared_client, headers, body)
+        assert r.status_code == status
+        if expected is not None:
+            plan = r.json()
+            for bucket, titles in expected.items():
+                assert plan[bucket] == titles
+
+    def test_request_schema_documented(self, shared_client):
+        r = shared_client.get("/openapi.json")
+        body = r.json()["paths"]["/api/v1/sync"]["post"]["requestBody"]
+        schema = body["content"]["application/json"]["schema"]
+        assert schema["required"] == ["titles"]
+        assert "title_id" in schema["properties"]["titles"]["items"]["properties"]
 
-    def test_no_last_synced_hash_conflicts(self, client, auth_headers):
-        """Without last_synced_hash, differing hashes -> conflict."""
-        save_data = b"server save data"
-        bundle = _make_bundle_bytes(
-            title_id=0x0004000000055D00,
-            timestamp=2000,
-            files=[("main", save_data)],
-        )
-        _upload(client, auth_headers, "0004000000055D00", bundle)
 
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": "different_hash__" * 4,
-                        "timestamp": 1000,
-                        "size": 512,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
+class TestSyncEndpoint:
+    def test_no_last_synced_hash_conflicts(self, seeded_client, auth_headers):
+        """Without last_synced_hash, differing hashes -> conflict."""
+        r = _post_sync(seeded_client, auth_headers, _SYNC_NO_LAST_SYNCED)
         assert r.status_code == 200
         plan = r.json()
         assert "0004000000055D00" in plan["conflict"]
 
     def test_three_way_client_changed(self, client, auth_headers):
         """last_synced == server hash, client differs -> upload."""
-        save_data = b"shared version"
         bundle = _make_bundle_bytes(
             title_id=0x0004000000055D00,
             timestamp=1000,
-            files=[("main", save_data)],
+            files=[("main", _SHARED_SAVE)],
         )
         _upload(client, auth_headers, "0004000000055D00", bundle)
-        server_hash = _save_hash(save_data)
-
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": "client_modified_" * 4,
-                        "timestamp": 2000,
-                        "size": 512,
-                        "last_synced_hash": server_hash,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
+
+        r = _post_sync(client, auth_headers, _SYNC_CLIENT_CHANGED)
         assert r.status_code == 200
         plan = r.json()
         assert "0004000000055D00" in plan["upload"]
 
     def test_three_way_server_changed(self, client, auth_headers):
         """last_synced == client hash, server differs -> download."""
-        save_data_v1 = b"version 1"
         bundle_v1 = _make_bundle_bytes(
             title_id=0x0004000000055D00,
             timestamp=1000,
-            files=[("main", save_data_v1)],
+            files=[("main", _V1_SAVE)],
         )
         _upload(client, auth_headers, "0004000000055D00", bundle_v1)
-        shared_hash = _save_hash(save_data_v1)
 
         # Another console uploads newer version
         save_data_v2 = b"version 2 from other console"
@@ -155,35 +211,19 @@ class TestSyncEndpoint:
         _upload(client, auth_headers, "0004000000055D00", bundle_v2)
 
         # This console hasn't changed (current == last_synced)
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": shared_hash,
-                        "timestamp": 1000,
-                        "size": 100,
-                        "last_synced_hash": shared_hash,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
+        r = _post_sync(client, auth_headers, _SYNC_CLIENT_UNCHANGED_V1)
         assert r.status_code == 200
         plan = r.json()
         assert "0004000000055D00" in plan["download"]
 
     def test_three_way_both_changed(self, client, auth_headers):
         """All three hashes differ -> conflict."""
-        save_data_v1 = b"original"
         bundle_v1 = _make_bundle_bytes(
             title_id=0x0004000000055D00,
             timestamp=1000,
-            files=[("main", save_data_v1)],
+            files=[("main", _ORIGINAL_SAVE)],
         )
         _upload(client, auth_headers, "0004000000055D00", bundle_v1)
-        last_synced = _save_hash(save_data_v1)
 
         # Server changes
         bundle_v2 = _make_bundle_bytes(
@@ -193,21 +233,7 @@ class TestSyncEndpoint:
         )
         _upload(client, auth_headers, "0004000000055D00", bundle_v2)
 
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": "client_also_chgd" * 4,
-                        "timestamp": 2000,
-                        "size": 500,
-                        "last_synced_hash": last_synced,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
+        r = _post_sync(client, auth_headers, _SYNC_BOTH_CHANGED)
         assert r.status_code == 200
         plan = r.json()
         assert "0004000000055D00" in plan["conflict"]
@@ -215,31 +241,15 @@ class TestSyncEndpoint:
     def test_multi_console_scenario(self, client, auth_headers):
         """Full A -> B -> A multi-console flow."""
         # Console A uploads
-        save_a = b"console A save"
         bundle_a = _make_bundle_bytes(
             title_id=0x0004000000055D00,
             timestamp=1000,
-            files=[("main", save_a)],
+            files=[("main", _CONSOLE_A_SAVE)],
         )
         _upload(client, auth_headers, "0004000000055D00", bundle_a)
-        hash_a = _save_hash(save_a)
 
         # Console B plays and modifies, syncs with last_synced from download
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": "console_b_played" * 4,
-                        "timestamp": 2000,
-                        "size": 200,
-                        "last_synced_hash": hash_a,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
+        r = _post_sync(client, auth_headers, _SYNC_CONSOLE_B_PLAYED)
         plan = r.json()
         assert "0004000000055D00" in plan["upload"]
 
@@ -253,195 +263,116 @@ class TestSyncEndpoint:
         _upload(client, auth_headers, "0004000000055D00", bundle_b)
 
         # Console A syncs: hasn't played, last_synced == current -> download
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": hash_a,
-                        "timestamp": 1000,
-                        "size": 100,
-                        "last_synced_hash": hash_a,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
+        r = _post_sync(client, auth_headers, _SYNC_CONSOLE_A_UNCHANGED)
         plan = r.json()
         assert "0004000000055D00" in plan["download"]
 
-    def test_hashes_match_up_to_date(self, client, auth_headers):
+    def test_hashes_match_up_to_date(self, seeded_client, auth_headers):
         """Same hash -> up to date, no transfer needed."""
-        save_data = b"same save data"
-        bundle = _make_bundle_bytes(
-            title_id=0x0004000000055D00,
-            timestamp=1000,
-            files=[("main", save_data)],
-        )
-        _upload(client, auth_headers, "0004000000055D00", bundle)
-
         # Get the server's stored hash
-        meta_r = client.get(
+        meta_r = seeded_client.get(
             "/api/v1/saves/0004000000055D00/meta", headers=auth_headers
         )
         server_hash = meta_r.json()["save_hash"]
 
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": server_hash,
-                        "timestamp": 1000,
-                        "size": len(save_data),
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
+        r = _post_sync(seeded_client, auth_headers, _sync_body({
+            "title_id": "0004000000055D00",
+            "save_hash": server_hash,
+            "timestamp": 1000,
+            "size": len(SEED_SAVE),
+        }))
         assert r.status_code == 200
         plan = r.json()
         assert "0004000000055D00" in plan["up_to_date"]
         assert plan["upload"] == []
         assert plan["download"] == []
 
-    def test_same_timestamp_different_hash_conflict(self, client, auth_headers):
-        """Same timestamp but different hash -> conflict."""
-        save_data = b"some save"
-        bundle = _make_bundle_bytes(
-            title_id=0x0004000000055D00,
-            timestamp=1000,
-            files=[("main", save_data)],
-        )
-        _upload(client, auth_headers, "0004000000055D00", bundle)
+    def test_uppercase_hash_up_to_date(self, seeded_client, auth_headers):
+        """Hex hashes are compared by value, regardless of case."""
+        r = _post_sync(seeded_client, auth_headers, _SYNC_UPPERCASE_HASH)
+        assert r.status_code == 200
+        assert "0004000000055D00" in r.json()["up_to_date"]
 
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "0004000000055D00",
-                        "save_hash": "completely_different" * 4,
-                        "timestamp": 1000,
-                        "size": 512,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
+    def test_same_timestamp_different_hash_conflict(self, seeded_client, auth_headers):
+        """Same timestamp but different hash -> conflict."""
+        r = _post_sync(seeded_client, auth_headers, _SYNC_SAME_TIMESTAMP)
         assert r.status_code == 200
         plan = r.json()
         assert "0004000000055D00" in plan["conflict"]
 
-    def test_server_only_titles(self, client, auth_headers):
+    def test_server_only_titles(self, seeded_client, auth_headers):
         """Titles on server but not in 3DS list -> server_only."""
-        bundle = _make_bundle_bytes(
-            title_id=0x0004000000055D00,
-            timestamp=1000,
-            files=[("main", b"data")],
-        )
-        _upload(client, auth_headers, "0004000000055D00", bundle)
-
         # Sync with empty title list
-        r = client.post(
-            "/api/v1/sync",
-            json={"titles": []},
-            headers=auth_headers,
-        )
+        r = _post_sync(seeded_client, auth_headers, _SYNC_EMPTY)
         assert r.status_code == 200
         plan = r.json()
         assert "0004000000055D00" in plan["server_only"]
 
     def test_mixed_scenario(self, client, auth_headers):
         """Multiple titles in different states."""
-        # Upload two saves to server
+        upload_headers = {**auth_headers, "Content-Type": "application/octet-stream"}
         bundle_a = _make_bundle_bytes(
             title_id=0x0004000000055D00,  # will be up-to-date
             timestamp=1000,
             files=[("main", b"game A")],
         )
-        _upload(client, auth_headers, "0004000000055D00", bundle_a)
-
-        # Upload initial version of game B, then update it
-        old_b_data = b"game B old"
         bundle_b_old = _make_bundle_bytes(
             title_id=0x00040000001B5000,
             timestamp=1000,
-            files=[("main", old_b_data)],
+            files=[("main", _GAME_B_OLD_SAVE)],
         )
-        _upload(client, auth_headers, "00040000001B5000", bundle_b_old)
-        last_synced_b = _save_hash(old_b_data)
-
-        # Another console updates game B on server
         bundle_b_new = _make_bundle_bytes(
             title_id=0x00040000001B5000,
             timestamp=2000,
             files=[("main", b"game B newer")],
         )
-        _upload(client, auth_headers, "00040000001B5000", bundle_b_new)
 
-        # Get hash for game A to simulate up-to-date
-        meta_a = client.get(
-            "/api/v1/saves/0004000000055D00/meta", headers=auth_headers
-        ).json()
-
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        # Game A: same hash -> up_to_date
-                        "title_id": "0004000000055D00",
-                        "save_hash": meta_a["save_hash"],
-                        "timestamp": 1000,
-                        "size": 6,
-                    },
-                    {
-                        # Game B: client unchanged, server changed -> download
-                        "title_id": "00040000001B5000",
-                        "save_hash": last_synced_b,
-                        "timestamp": 1000,
-                        "size": 6,
-                        "last_synced_hash": last_synced_b,
-                    },
-                    {
-                        # Game C: only on client -> upload
-                        "title_id": "0004000000044B00",
-                        "save_hash": "new_game_hash_______" * 4,
-                        "timestamp": 3000,
-                        "size": 100,
-                    },
-                ],
-            },
-            headers=auth_headers,
+        # Upload game A and the initial version of game B; different titles,
+        # so the two uploads are independent and can run concurrently
+        responses = client.gather(
+            ("POST", "/api/v1/saves/0004000000055D00",
+             {"content": bundle_a, "headers": upload_headers}),
+            ("POST", "/api/v1/saves/00040000001B5000",
+             {"content": bundle_b_old, "headers": upload_headers}),
+        )
+        assert [r.status_code for r in responses] == [200, 200]
+
+        # Another console updates game B on server (must follow the old upload),
+        # while fetching game A's hash to simulate up-to-date
+        upload_b_new, meta_a = client.gather(
+            ("POST", "/api/v1/saves/00040000001B5000",
+             {"content": bundle_b_new, "headers": upload_headers}),
+            ("GET", "/api/v1/saves/0004000000055D00/meta", {"headers": auth_headers}),
         )
+        assert upload_b_new.status_code == 200
+        meta_a = meta_a.json()
+
+        r = _post_sync(client, auth_headers, _sync_body(
+            {
+                # Game A: same hash -> up_to_date
+                "title_id": "0004000000055D00",
+                "save_hash": meta_a["save_hash"],
+                "timestamp": 1000,
+                "size": 6,
+            },
+            {
+                # Game B: client unchanged, server changed -> download
+                "title_id": "00040000001B5000",
+                "save_hash": _HASH_GAME_B_OLD,
+                "timestamp": 1000,
+                "size": 6,
+                "last_synced_hash": _HASH_GAME_B_OLD,
+            },
+            {
+                # Game C: only on client -> upload
+                "title_id": "0004000000044B00",
+                "save_hash": "new_game_hash_______" * 4,
+                "timestamp": 3000,
+                "size": 100,
+            },
+        ))
         assert r.status_code == 200
         plan = r.json()
         assert "0004000000055D00" in plan["up_to_date"]
         assert "00040000001B5000" in plan["download"]
         assert "0004000000044B00" in plan["upload"]
-
-    def test_sync_requires_auth(self, client):
-        """Sync endpoint requires API key."""
-        r = client.post("/api/v1/sync", json={"titles": []})
-        assert r.status_code == 401
-
-    def test_invalid_title_id_rejected(self, client, auth_headers):
-        """Invalid title ID format is rejected by validation."""
-        r = client.post(
-            "/api/v1/sync",
-            json={
-                "titles": [
-                    {
-                        "title_id": "not-hex",
-                        "save_hash": "abc123",
-                        "timestamp": 1000,
-                        "size": 100,
-                    }
-                ]
-            },
-            headers=auth_headers,
-        )
-        assert r.status_code == 422
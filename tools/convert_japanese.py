@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Convert Japanese characters in game database to romaji."""
 
+import os
 import re
 from pathlib import Path
 
@@ -14,6 +15,9 @@ JAPANESE_RE = re.compile(r'[\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FFF]')
 # Korean characters - can't convert these
 KOREAN_RE = re.compile(r'[\uAC00-\uD7AF\u1100-\u11FF]')
 
+# Either script, Korean in group 1; plain names are classified in one scan
+SCRIPT_RE = re.compile(f'({KOREAN_RE.pattern})|{JAPANESE_RE.pattern}')
+
 # Special characters to replace
 SPECIAL_CHARS = {
     '\u30FB': ' ',  # Katakana middle dot → space
@@ -34,72 +38,73 @@ SPECIAL_CHARS = {
     '\uFF1F': '?',  # Fullwidth question mark
 }
 
+# All replacements applied in one pass by str.translate
+SPECIAL_CHARS_TABLE = str.maketrans(SPECIAL_CHARS)
+
+WHITESPACE_RE = re.compile(r'\s+')
+
 
 def clean_special_chars(text: str) -> str:
     """Replace special Unicode chars with ASCII equivalents."""
-    for char, replacement in SPECIAL_CHARS.items():
-        text = text.replace(char, replacement)
+    text = text.translate(SPECIAL_CHARS_TABLE)
     # Clean up multiple spaces
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = WHITESPACE_RE.sub(' ', text).strip()
     return text
 
 
 def main():
     kks = pykakasi.kakasi()
 
-    lines = DB_PATH.read_text(encoding='utf-8').splitlines()
-    new_lines = []
+    tmp_path = DB_PATH.with_suffix('.tmp')
+    line_count = 0
     converted_count = 0
     korean_count = 0
 
-    for line in lines:
-        if not line.strip():
-            new_lines.append(line)
-            continue
-
-        parts = line.split(',', 1)
-        if len(parts) != 2:
-            new_lines.append(line)
-            continue
-
-        code, name = parts
-
-        # Skip Korean - can't convert to romaji
-        if KOREAN_RE.search(name):
-            korean_count += 1
-            continue
-
-        # Convert Japanese to romaji
-        if JAPANESE_RE.search(name):
-            # First clean special chars
-            name = clean_special_chars(name)
-
-            result = kks.convert(name)
-            romaji_parts = []
-            for item in result:
-                # Use hepburn romanization
-                romaji_parts.append(item['hepburn'])
-
-            # Join and clean up
-            romaji = ''.join(romaji_parts)
-            # Clean any remaining special chars after conversion
-            romaji = clean_special_chars(romaji)
-            # Capitalize first letter of each word
-            romaji = ' '.join(word.capitalize() for word in romaji.split())
-
-            new_lines.append(f"{code},{romaji}")
-            converted_count += 1
-        else:
-            # Also clean special chars in non-Japanese entries
-            name = clean_special_chars(name)
-            new_lines.append(f"{code},{name}")
-
-    # Write back
-    DB_PATH.write_text('\n'.join(new_lines) + '\n', encoding='utf-8')
+    # Stream the database into a sibling file, then swap it into place
+    with open(DB_PATH, encoding='utf-8') as src, \
+            open(tmp_path, 'w', encoding='utf-8') as dst:
+        for line in src:
+            line = line.rstrip('\n')
+            parts = line.split(',', 1)
+            if not line.strip() or len(parts) != 2:
+                new_line = line
+            else:
+                code, name = parts
+                script = SCRIPT_RE.search(name)
+
+                # Skip Korean - can't convert to romaji. Korean may also
+                # follow a Japanese character, so check the rest of the name
+                if script and (script.group(1) or KOREAN_RE.search(name, script.end())):
+                    korean_count += 1
+                    continue
+
+                # Convert Japanese to romaji
+                if script:
+                    # First clean special chars
+                    name = clean_special_chars(name)
+
+                    # Join the hepburn romanization of each converted chunk
+                    romaji = ''.join(item['hepburn'] for item in kks.convert(name))
+                    # Clean any remaining special chars after conversion
+                    romaji = clean_special_chars(romaji)
+                    # Capitalize first letter of each word
+                    romaji = ' '.join(word.capitalize() for word in romaji.split())
+
+                    new_line = f"{code},{romaji}"
+                    converted_count += 1
+                else:
+                    # Also clean special chars in non-Japanese entries
+                    name = clean_special_chars(name)
+                    new_line = f"{code},{name}"
+
+            dst.write(new_line + '\n')
+            line_count += 1
+
+    os.replace(tmp_path, DB_PATH)
 
     print(f"Converted {converted_count} Japanese entries to romaji")
     print(f"Removed {korean_count} Korean entries (no romaji available)")
-    print(f"Total lines: {len(new_lines)}")
+    print(f"Total lines: {line_count}")
 
 
 if __name__ == '__main__':
@@ -10,25 +10,45 @@ Usage:
 """
 
 import argparse
+import os
+import re
 import shutil
 import sys
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
 
 NDS_GAMECODE_OFFSET = 0x0C
+PRINTABLE_ASCII = bytes(range(0x20, 0x7F))
+
+# Game code in a standard "Game Name (CODE).nds" filename
+FILENAME_CODE_RE = re.compile(r"\(([A-Z0-9]{4})\)\.nds$", re.IGNORECASE)
+
+# Characters not allowed in filenames, deleted in one str.translate pass
+FILENAME_STRIP_TABLE = str.maketrans("", "", '<>:"/\\|?*')
 
 
 # --- ROM identification ---
 
 def read_gamecode(rom_path: Path) -> str | None:
     """Read the 4-char game code from an NDS ROM header."""
+    # Raw fd reads: no buffered file object for a 4-byte read
     try:
-        with open(rom_path, "rb") as f:
-            f.seek(NDS_GAMECODE_OFFSET)
-            code = f.read(4)
-            if len(code) == 4 and all(0x20 <= b <= 0x7E for b in code):
-                return code.decode("ascii")
-    except (OSError, UnicodeDecodeError):
-        pass
+        fd = os.open(rom_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            if hasattr(os, "pread"):
+                code = os.pread(fd, 4, NDS_GAMECODE_OFFSET)
+            else:  # Windows
+                os.lseek(fd, NDS_GAMECODE_OFFSET, os.SEEK_SET)
+                code = os.read(fd, 4)
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+    # Printable ASCII only: deleting those bytes must leave nothing
+    if len(code) == 4 and not code.translate(None, PRINTABLE_ASCII):
+        return code.decode("ascii")
     return None
 
 
@@ -41,39 +61,94 @@ def standard_name(code: str, name_db: dict[str, str]) -> str:
     name = name_db.get(code)
     if name:
         # Clean characters not allowed in filenames
-        for ch in '<>:"/\\|?*':
-            name = name.replace(ch, "")
+        name = name.translate(FILENAME_STRIP_TABLE)
         return f"{name} ({code}).nds"
     return f"({code}).nds"
 
 
-def scan_roms(directory: Path) -> dict[str, Path]:
-    """Find all .nds files recursively. Returns dict of game_code -> path.
+def walk_tree(directory: Path) -> tuple[list[Path], list[Path]]:
+    """Find all .nds and .sav files recursively in a single directory walk.
 
-    Deduplicates by game code (first found wins).
+    Returns (roms, saves), each sorted by path. Like rglob, symlinked
+    directories are not followed, and unreadable directories are skipped.
     """
-    roms = {}
+    roms = []
+    saves = []
     if not directory.exists():
-        return roms
-    for f in sorted(directory.rglob("*.nds")):
-        code = read_gamecode(f)
+        return roms, saves
+    stack = [str(directory)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                # normcase matches glob's case rules (insensitive on Windows)
+                name = os.path.normcase(entry.name)
+                if name.endswith(".nds"):
+                    roms.append(Path(entry.path))
+                elif name.endswith(".sav"):
+                    saves.append(Path(entry.path))
+    return sorted(roms), sorted(saves)
+
+
+def code_from_filename(rom_path: Path, name_db: dict[str, str]) -> str | None:
+    """Return the game code of an already standard-named ROM, if it's known."""
+    match = FILENAME_CODE_RE.search(rom_path.name)
+    if match:
+        code = match.group(1).upper()
+        if code in name_db:
+            return code
+    return None
+
+
+def roms_by_code(rom_paths: list[Path], io_threads: int = 8,
+                 name_db: dict[str, str] | None = None) -> dict[str, Path]:
+    """Map game_code -> path for sorted ROM paths (first found wins).
+
+    ROMs already carrying a standard name with a code from name_db are
+    trusted without opening them; after the first sync that's most of them.
+    The remaining headers are read on io_threads threads: each read is
+    mostly waiting on the disk (slow on SD cards), and the GIL is released
+    meanwhile.
+    """
+    codes = [code_from_filename(f, name_db) if name_db else None for f in rom_paths]
+    unread = [i for i, code in enumerate(codes) if code is None]
+    to_read = [rom_paths[i] for i in unread]
+    if io_threads > 1 and len(to_read) > 1:
+        with ThreadPoolExecutor(max_workers=min(io_threads, len(to_read))) as ex:
+            read = list(ex.map(read_gamecode, to_read))
+    else:
+        read = [read_gamecode(f) for f in to_read]
+    for i, code in zip(unread, read):
+        codes[i] = code
+
+    roms = {}
+    for f, code in zip(rom_paths, codes):
         if code and code not in roms:
             roms[code] = f
     return roms
 
 
+def saves_by_stem(sav_paths: list[Path]) -> dict[str, Path]:
+    """Map stem -> path for sorted save paths (first found wins)."""
+    saves = {}
+    for f in sav_paths:
+        if f.stem not in saves:
+            saves[f.stem] = f
+    return saves
+
+
 def scan_saves(directory: Path) -> dict[str, Path]:
     """Find all .sav files recursively. Returns dict of stem -> path.
 
     Deduplicates by stem (first found wins).
     """
-    saves = {}
-    if not directory.exists():
-        return saves
-    for f in sorted(directory.rglob("*.sav")):
-        if f.stem not in saves:
-            saves[f.stem] = f
-    return saves
+    return saves_by_stem(walk_tree(directory)[1])
 
 
 def find_rom_dir(sd_path: Path) -> Path | None:
@@ -157,6 +232,82 @@ def format_size(size: int) -> str:
     return f"{size} B"
 
 
+def index_orphans(orphans: list[tuple[str, Path]],
+                  scene_db: dict[str, str]) -> dict:
+    """Index one directory's orphan saves for matching them to ROMs.
+
+    Returns a dict of:
+      by_scene: game code -> saves whose stem is a known scene release name
+      by_code:  each 4-char run of the uppercased stem -> saves containing it
+      names:    every lowercased stem joined by NULs, searched by name_matches
+      starts:   offset of each stem in names
+      paths:    save path of each stem in names
+    Every list keeps the orphans' original order.
+    """
+    by_scene: dict[str, list[Path]] = {}
+    by_code: dict[str, list[Path]] = {}
+    lowered = [stem.lower() for stem, _ in orphans]
+    starts = []
+    offset = 0
+    for (stem, sav_path), stem_lower in zip(orphans, lowered):
+        scene_code = scene_db.get(stem_lower)
+        if scene_code:
+            by_scene.setdefault(scene_code, []).append(sav_path)
+        stem_upper = stem.upper()
+        for window in {stem_upper[i:i + 4] for i in range(len(stem_upper) - 3)}:
+            by_code.setdefault(window, []).append(sav_path)
+        starts.append(offset)
+        offset += len(stem_lower) + 1
+    return {
+        "by_scene": by_scene,
+        "by_code": by_code,
+        "names": "\0".join(lowered),
+        "starts": starts,
+        "paths": [sav_path for _, sav_path in orphans],
+    }
+
+
+def name_matches(index: dict, game_name: str):
+    """Yield the indexed saves whose lowercased stem contains game_name, in order.
+
+    Searches all stems at once with str.find; the NUL separators keep a
+    match from spanning two stems, since names never contain NUL.
+    """
+    names, starts, paths = index["names"], index["starts"], index["paths"]
+    pos = names.find(game_name)
+    while pos != -1:
+        i = bisect_right(starts, pos) - 1
+        yield paths[i]
+        if i + 1 == len(starts):
+            return
+        pos = names.find(game_name, starts[i + 1])
+
+
+def take_orphan(candidates, matched: set[Path]) -> Path | None:
+    """Return the first candidate save not already matched, marking it matched."""
+    for sav_path in candidates:
+        if sav_path not in matched:
+            matched.add(sav_path)
+            return sav_path
+    return None
+
+
+def file_listed(path: Path, listings: dict[Path, set[str]]) -> bool:
+    """Check whether path exists using a cached listing of its directory.
+
+    One listdir per directory replaces an exists() stat per candidate file.
+    Names are normcased to keep exists()' case rules on Windows.
+    """
+    names = listings.get(path.parent)
+    if names is None:
+        try:
+            names = {os.path.normcase(n) for n in os.listdir(path.parent)}
+        except OSError:
+            names = set()
+        listings[path.parent] = names
+    return os.path.normcase(path.name) in names
+
+
 def rename_rom(rom_path: Path, new_name: str, dry_run: bool,
                known_sav: Path | None = None) -> Path:
     """Rename a ROM file and its matching .sav file.
@@ -210,6 +361,14 @@ def rename_rom(rom_path: Path, new_name: str, dry_run: bool,
     return rom_path
 
 
+def copy_in_order(pairs: list[tuple[Path, Path]]) -> None:
+    """Copy (src, dst) pairs one after another; later copies to a dst win."""
+    for src, dst in pairs:
+        # Contents only: ROM timestamps and permission bits don't matter,
+        # so skip copy2's extra copystat pass
+        shutil.copyfile(src, dst)
+
+
 # --- Main ---
 
 def main():
@@ -233,6 +392,10 @@ Examples:
                         help="Show what would be done without making changes")
     parser.add_argument("--clean-orphans", action="store_true",
                         help="Delete orphan save files (saves with no matching ROM)")
+    parser.add_argument("--io-threads", type=int, default=8,
+                        help="Threads for reading ROM headers (default: 8, 1 = no threading)")
+    parser.add_argument("--copy-threads", type=int, default=4,
+                        help="ROM files copied at once (default: 4)")
 
     args = parser.parse_args()
 
@@ -268,9 +431,11 @@ Examples:
         print("(dry run)")
     print()
 
-    # Scan both sides by game code
-    sd_roms = scan_roms(sd_rom_dir)
-    local_roms = scan_roms(args.local_dir)
+    # Scan both sides by game code, walking each tree once for ROMs and saves
+    sd_rom_paths, sd_sav_paths = walk_tree(sd_rom_dir)
+    local_rom_paths, local_sav_paths = walk_tree(args.local_dir)
+    sd_roms = roms_by_code(sd_rom_paths, args.io_threads, name_db)
+    local_roms = roms_by_code(local_rom_paths, args.io_threads, name_db)
 
     # Filter out ROMs not in the database (boot ROMs, utilities like GodMode9, etc.)
     sd_skipped = {c: p for c, p in sd_roms.items() if c not in name_db}
@@ -281,7 +446,7 @@ Examples:
     if sd_skipped or local_skipped:
         total_skipped = len(sd_skipped) + len(local_skipped)
         print(f"Skipped {total_skipped} non-game ROM(s) not in database:")
-        for code, path in {**sd_skipped, **local_skipped}.items():
+        for code, path in chain(sd_skipped.items(), local_skipped.items()):
             print(f"  {path.name} ({code})")
         print()
 
@@ -291,6 +456,10 @@ Examples:
     to_download = sd_codes - local_codes   # SD -> PC
     to_upload = local_codes - sd_codes     # PC -> SD
     in_common = sd_codes & local_codes
+    all_codes = sd_codes | local_codes
+
+    # Standard filename for every ROM on either side, computed once
+    std_names = {code: standard_name(code, name_db) for code in all_codes}
 
     print(f"SD card:    {len(sd_roms)} unique ROM(s)")
     print(f"Local:      {len(local_roms)} unique ROM(s)")
@@ -301,25 +470,30 @@ Examples:
     do_rename = not args.no_rename
 
     # Step 1: Rename existing files to standard names
+    sd_renamed = 0
     if do_rename:
         renamed = 0
-        for roms_dict, rom_dir in [(sd_roms, sd_rom_dir),
-                                    (local_roms, args.local_dir)]:
-            # Scan all saves in this directory tree
-            all_saves = scan_saves(rom_dir)
+        for roms_dict, sav_paths in [(sd_roms, sd_sav_paths),
+                                      (local_roms, local_sav_paths)]:
+            # All saves in this directory tree
+            all_saves = saves_by_stem(sav_paths)
 
             # Build set of ROM stems for orphan detection
             rom_stems = {p.stem for p in roms_dict.values()}
 
-            # Orphan saves: .sav files whose stem doesn't match any ROM
+            # Orphan saves: .sav files whose stem doesn't match any ROM,
+            # indexed per directory; matched ones are tracked in orphans_taken
             orphan_by_dir: dict[Path, list[tuple[str, Path]]] = {}
             for stem, sav_path in all_saves.items():
                 if stem not in rom_stems:
                     d = sav_path.parent
                     orphan_by_dir.setdefault(d, []).append((stem, sav_path))
+            orphan_index = {d: index_orphans(orphans, scene_db)
+                            for d, orphans in orphan_by_dir.items()}
+            orphans_taken: set[Path] = set()
 
             for code, path in list(roms_dict.items()):
-                std = standard_name(code, name_db)
+                std = std_names[code]
                 std_stem = Path(std).stem
                 needs_rom_rename = (path.name != std)
 
@@ -340,28 +514,20 @@ Examples:
                         game_name = name_db.get(code, "").lower()
                         code_upper = code.upper()
                         for search_dir in [path.parent, path.parent / "saves"]:
-                            orphans = orphan_by_dir.get(search_dir, [])
+                            index = orphan_index.get(search_dir)
+                            if index is None:
+                                continue
                             # Pass 0: scene database exact match
-                            if scene_db:
-                                for idx, (stem, sav_path) in enumerate(orphans):
-                                    if scene_db.get(stem.lower()) == code_upper:
-                                        known_sav = sav_path
-                                        orphans.pop(idx)
-                                        break
+                            known_sav = take_orphan(
+                                index["by_scene"].get(code_upper, ()), orphans_taken)
                             # Pass 1: game name match
                             if not known_sav and game_name:
-                                for idx, (stem, sav_path) in enumerate(orphans):
-                                    if game_name in stem.lower():
-                                        known_sav = sav_path
-                                        orphans.pop(idx)
-                                        break
+                                known_sav = take_orphan(
+                                    name_matches(index, game_name), orphans_taken)
                             # Pass 2: game code match (handles scene names)
                             if not known_sav:
-                                for idx, (stem, sav_path) in enumerate(orphans):
-                                    if code_upper in stem.upper():
-                                        known_sav = sav_path
-                                        orphans.pop(idx)
-                                        break
+                                known_sav = take_orphan(
+                                    index["by_code"].get(code_upper, ()), orphans_taken)
                             if known_sav:
                                 break
 
@@ -369,50 +535,71 @@ Examples:
                     roms_dict[code] = rename_rom(path, std, args.dry_run, known_sav)
                     renamed += 1
 
+            if roms_dict is sd_roms:
+                sd_renamed = renamed
+
         if renamed:
             print(f"\nRenamed {renamed} file(s) to standard names")
 
+    # ROM copies run on a small pool: source and destination are usually
+    # different devices, and several streams keep both of them busy.
+    # Progress is printed here, as each copy is queued, to keep it in order.
+    # Copies are grouped by destination first: with --no-rename two ROMs can
+    # share a file name, and those must not be written concurrently
+    copies_by_dst: dict[str, list[tuple[Path, Path]]] = {}
+
     # Step 2: Copy SD -> PC
     if to_download:
-        total_size = sum(sd_roms[c].stat().st_size for c in to_download)
+        # Stat each ROM once, for both the total and its own line
+        sizes = {c: sd_roms[c].stat().st_size for c in to_download}
+        total_size = sum(sizes.values())
         print(f"\nCopying {len(to_download)} ROM(s) from SD to PC ({format_size(total_size)}):")
         for code in sorted(to_download):
             src = sd_roms[code]
-            dst_name = standard_name(code, name_db) if do_rename else src.name
+            dst_name = std_names[code] if do_rename else src.name
             dst = args.local_dir / dst_name
-            size = format_size(src.stat().st_size)
+            size = format_size(sizes[code])
             db_name = name_db.get(code, "?")
             print(f"  {db_name:<40s} {code}  {size:>8s}")
-            if not args.dry_run:
-                shutil.copy2(src, dst)
+            copies_by_dst.setdefault(os.path.normcase(dst), []).append((src, dst))
 
     # Step 3: Copy PC -> SD
     if to_upload:
-        total_size = sum(local_roms[c].stat().st_size for c in to_upload)
+        sizes = {c: local_roms[c].stat().st_size for c in to_upload}
+        total_size = sum(sizes.values())
         print(f"\nCopying {len(to_upload)} ROM(s) from PC to SD ({format_size(total_size)}):")
         for code in sorted(to_upload):
             src = local_roms[code]
-            dst_name = standard_name(code, name_db) if do_rename else src.name
+            dst_name = std_names[code] if do_rename else src.name
             dst = sd_rom_dir / dst_name
-            size = format_size(src.stat().st_size)
+            size = format_size(sizes[code])
             db_name = name_db.get(code, "?")
             print(f"  {db_name:<40s} {code}  {size:>8s}")
-            if not args.dry_run:
-                shutil.copy2(src, dst)
+            copies_by_dst.setdefault(os.path.normcase(dst), []).append((src, dst))
+
+    if not args.dry_run:
+        with ThreadPoolExecutor(max_workers=max(args.copy_threads, 1)) as copier:
+            copies = [
+                copier.submit(copy_in_order, pairs) for pairs in copies_by_dst.values()
+            ]
+            # Surface the first failed copy, as the sequential loop did
+            for copy in copies:
+                copy.result()
 
     # Step 4: Copy save files from SD to local folder
     # For each ROM in common (or just copied), check if SD has a save but local doesn't
     saves_copied = 0
     missing_saves = []
-    all_codes = sd_codes | local_codes
+    # Listed after the renames in step 1, so names match what's on disk now
+    listings: dict[Path, set[str]] = {}
     for code in sorted(all_codes):
-        std = standard_name(code, name_db) if do_rename else None
+        std = std_names[code] if do_rename else None
         sav_name = Path(std).with_suffix(".sav").name if std else f"({code}).sav"
 
         # Check if local already has this save
         local_sav = args.local_dir / sav_name
         local_saves_dir = args.local_dir / "saves" / sav_name
-        if local_sav.exists() or local_saves_dir.exists():
+        if file_listed(local_sav, listings) or file_listed(local_saves_dir, listings):
             continue
 
         # Check if SD has this save (by ROM path, or by standard name in rom dir)
@@ -422,7 +609,7 @@ Examples:
             # ROM exists on SD - check next to it and in saves/ subdir
             for candidate in [sd_path.with_suffix(".sav"),
                               sd_path.parent / "saves" / f"{sd_path.stem}.sav"]:
-                if candidate.exists():
+                if file_listed(candidate, listings):
                     src_sav = candidate
                     break
         if not src_sav:
@@ -430,7 +617,7 @@ Examples:
             # Check by standard save name in SD rom dir
             for candidate in [sd_rom_dir / sav_name,
                               sd_rom_dir / "saves" / sav_name]:
-                if candidate.exists():
+                if file_listed(candidate, listings):
                     src_sav = candidate
                     break
 
@@ -442,6 +629,7 @@ Examples:
             print(f"  {db_name:<40s} {code}  {size:>8s}")
             if not args.dry_run:
                 shutil.copy2(src_sav, local_sav)
+                listings[args.local_dir].add(os.path.normcase(sav_name))
             saves_copied += 1
         else:
             missing_saves.append(code)
@@ -456,26 +644,30 @@ Examples:
     # Build set of all known ROM stems (SD + standard names for all known codes)
     known_stems = {p.stem for p in sd_roms.values()}
     if do_rename:
-        for code in all_codes:
-            known_stems.add(Path(standard_name(code, name_db)).stem)
+        known_stems.update(Path(std_names[code]).stem for code in all_codes)
     orphan_savs = []
-    all_sd_saves = scan_saves(sd_rom_dir)
+    # The initial walk is still current unless step 1 renamed files on SD
+    if sd_renamed and not args.dry_run:
+        all_sd_saves = scan_saves(sd_rom_dir)
+    else:
+        all_sd_saves = saves_by_stem(sd_sav_paths)
     for stem, sav_path in sorted(all_sd_saves.items()):
         if stem not in known_stems:
             orphan_savs.append(sav_path)
     if orphan_savs:
+        orphan_sizes = [sav.stat().st_size for sav in orphan_savs]
         if args.clean_orphans:
-            total_size = sum(s.stat().st_size for s in orphan_savs)
+            total_size = sum(orphan_sizes)
             print(f"\nDeleting {len(orphan_savs)} orphan save file(s) ({format_size(total_size)}):")
-            for sav in orphan_savs:
-                size = format_size(sav.stat().st_size)
+            for sav, sav_size in zip(orphan_savs, orphan_sizes):
+                size = format_size(sav_size)
                 print(f"  {sav.name:<50s} {size:>8s}")
                 if not args.dry_run:
                     sav.unlink()
         else:
             print(f"\nOrphan save files ({len(orphan_savs)} with no matching ROM):")
-            for sav in orphan_savs:
-                size = format_size(sav.stat().st_size)
+            for sav, sav_size in zip(orphan_savs, orphan_sizes):
+                size = format_size(sav_size)
                 print(f"  {sav.name:<50s} {size:>8s}")
             print("  (use --clean-orphans to delete these)")
 
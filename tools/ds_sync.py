@@ -13,6 +13,7 @@ Usage:
 import argparse
 import hashlib
 import json
+import os
 import random
 import struct
 import sys
@@ -26,6 +27,7 @@ from urllib.error import HTTPError, URLError
 
 TITLE_ID_PREFIX = 0x00048000  # Prefix for DS game title IDs
 NDS_GAMECODE_OFFSET = 0x0C    # Offset of 4-char game code in NDS ROM header
+PRINTABLE_ASCII = bytes(range(0x20, 0x7F))  # Valid game code bytes
 BUNDLE_MAGIC = b"3DSS"
 BUNDLE_VERSION_COMPRESSED = 2
 SYNC_DIR_NAME = ".ds_sync"    # Hidden folder on SD card for sync data
@@ -53,14 +55,22 @@ def title_id_to_gamecode(title_id: str) -> str:
 
 def read_gamecode(rom_path: Path) -> str | None:
     """Read the 4-char game code from an NDS ROM header."""
+    # Raw fd reads: no buffered file object for a 4-byte read
     try:
-        with open(rom_path, "rb") as f:
-            f.seek(NDS_GAMECODE_OFFSET)
-            code = f.read(4)
-            if len(code) == 4 and all(0x20 <= b <= 0x7E for b in code):
-                return code.decode("ascii")
-    except (OSError, UnicodeDecodeError):
-        pass
+        fd = os.open(rom_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            if hasattr(os, "pread"):
+                code = os.pread(fd, 4, NDS_GAMECODE_OFFSET)
+            else:  # Windows
+                os.lseek(fd, NDS_GAMECODE_OFFSET, os.SEEK_SET)
+                code = os.read(fd, 4)
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+    # Printable ASCII only: deleting those bytes must leave nothing
+    if len(code) == 4 and not code.translate(None, PRINTABLE_ASCII):
+        return code.decode("ascii")
     return None
 
 
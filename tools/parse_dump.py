@@ -50,9 +50,11 @@ print(f"Additional data: {additional_size_2} bytes")
 # based on hex inspection showing register-like values there
 reg_offset = 0x28
 print(f"\n--- Registers (from offset 0x{reg_offset:02x}) ---")
-for i in range(min(20, (len(data) - reg_offset) // 4)):
-    val = struct.unpack_from("<I", data, reg_offset + i * 4)[0]
-    name = REG_NAMES[i] if i < len(REG_NAMES) else f"r{i}"
+# Unpack every register present in one call (the dump may be truncated)
+# (unpack_from raises when the offset is past the end, even for zero words)
+nb_words = max(0, min(20, (len(data) - reg_offset) // 4))
+registers = struct.unpack_from(f"<{nb_words}I", data, reg_offset) if nb_words else ()
+for name, val in zip(REG_NAMES, registers):
     print(f"  {name:5s} = 0x{val:08X}")
     if name == "pc":
         pc = val
@@ -66,7 +68,8 @@ print(f"  LR (return address): 0x{lr:08X}")
 # Code dump follows registers
 code_offset = reg_offset + 20 * 4  # after ~20 registers
 print(f"\n--- Code dump at offset 0x{code_offset:02x} (first 64 bytes) ---")
-for i in range(0, min(64, len(data) - code_offset), 4):
-    val = struct.unpack_from("<I", data, code_offset + i)[0]
+nb_words = max(0, min(16, (len(data) - code_offset) // 4))
+code_words = struct.unpack_from(f"<{nb_words}I", data, code_offset) if nb_words else ()
+for i, val in zip(range(0, 64, 4), code_words):
     addr_guess = pc - code_size_2 // 2 + i if code_size_2 > 0 else i
     print(f"  {addr_guess:#010x}: {val:08x}")